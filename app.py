@@ -7,12 +7,14 @@ import streamlit as st
 
 # Local modules - Core
 from weights import validate_manual_weights
-from model import IoTSustainability
+from model import IoTSustainability, FleetSustainability
+from fleet import PendingImports, weights_vector
+from metrics import METRIC_CODES
 
 # Local modules - Utils
-from utils.constants import METRIC_NAMES, FORM_KEYS, DASHBOARD_GUIDE, RECOMMENDED_WEIGHTS
-from utils.helpers import create_weights_snapshot, to_dict_flat, extract_weight_value
-from utils.state import initialize_state, reset_state
+from utils.constants import METRIC_NAMES, FORM_KEYS, DASHBOARD_GUIDE, RECOMMENDED_WEIGHTS, DEVICE_FIELD_TYPES
+from utils.helpers import create_weights_snapshot, find_config_name
+from utils.state import initialize_state, reset_state, refresh_global_result
 
 # Local modules - Components
 from components.devices import show_device, show_global_results
@@ -24,7 +26,7 @@ from services.ahp_service import show_ahp_matrix
 from services.export import export_results_excel, export_devices_list
 from services.import_service import (
     generate_excel_template,
-    read_devices_file,
+    read_devices_files,
     generate_json_template
 )
 
@@ -35,38 +37,43 @@ st.set_page_config(page_title="Dashboard Sostenibilidad IoT", page_icon="🌱",
 initialize_state()
 initialize_form()
 
-# Initialize device selection state
-if 'selected_devices' not in st.session_state:
-    st.session_state.selected_devices = {}
-
-def update_device_selection():
-    """Updates the device selection state."""
-    if 'selected_devices' not in st.session_state:
-        st.session_state.selected_devices = {}
-    
-    # Keep only selections for devices that still exist
-    current_devices = {device['id']: device for device in st.session_state.devices}
-    st.session_state.selected_devices = {
-        id: selected 
-        for id, selected in st.session_state.selected_devices.items()
-        if id in current_devices
-    }
-    
-    # Add new devices as selected by default
-    for id in current_devices:
-        if id not in st.session_state.selected_devices:
-            st.session_state.selected_devices[id] = True
-    
-    # Remove global results if they exist
-    if 'global_result' in st.session_state:
-        del st.session_state.global_result
-
 def get_selected_devices():
     """Returns the list of currently selected devices."""
-    return [
-        d for d in st.session_state.devices
-        if st.session_state.selected_devices.get(d['id'], True)
-    ]
+    devices = st.session_state.devices
+    return [devices.get(id) for id in devices.selected_ids()]
+
+def add_imported_devices(hashes, weight_mode):
+    """Scores the given pending imports in one vectorized call and adds them to the fleet.
+
+    Every device gets the weights of the active mode, resolved (and snapshotted) once.
+    """
+    if weight_mode == "Calcular nuevos pesos":
+        user_weights = st.session_state.get('ahp_weights') or RECOMMENDED_WEIGHTS
+    elif weight_mode == "Ajuste Manual":
+        manual_weights = {k: st.session_state[f"manual_weight_{k}"] for k in METRIC_NAMES}
+        user_weights, _ = validate_manual_weights(manual_weights)
+    else:
+        user_weights = RECOMMENDED_WEIGHTS
+    weights_snapshot = create_weights_snapshot(user_weights, weight_mode)
+
+    pending = st.session_state['imported_devices']
+    columns = pending.columns(hashes)
+    # Score every imported device in a single vectorized pass
+    fleet_result = FleetSustainability(dict(zip(METRIC_CODES, weights_vector(user_weights)))).calculate_sustainability(columns)
+
+    metadata = []
+    for device in pending.records(hashes):
+        meta = {k: v for k, v in device.items() if k not in DEVICE_FIELD_TYPES}
+        meta.update({
+            "calculation_done": True,
+            "used_weights": user_weights,
+            "snapshot_form": device.copy(),
+            "weights_snapshot": weights_snapshot
+        })
+        metadata.append(meta)
+    st.session_state.devices.extend_columns(columns, fleet_result, metadata)
+    pending.remove_many(hashes)
+    refresh_global_result()
 
 # --- NAVIGATION CONTROL ---
 if st.session_state.ahp_matrix_open:
@@ -81,12 +88,12 @@ if st.button("Reiniciar"):
     reset_state()
     if 'imported_devices' in st.session_state:
         del st.session_state['imported_devices']
+    if 'import_errors' in st.session_state:
+        del st.session_state['import_errors']
     if 'import_csv' in st.session_state:
         del st.session_state['import_csv']
     if 'show_import' in st.session_state:
         st.session_state['show_import'] = False
-    if 'selected_devices' in st.session_state:
-        del st.session_state['selected_devices']
     st.rerun()
 
 st.markdown("## Descripción de Métricas y Guía de Uso")
@@ -156,7 +163,7 @@ with import_container:
 
     # Show uploader only if show_import is True
     if st.session_state.show_import:
-        st.info("Sube un archivo CSV, Excel o JSON con la lista de dispositivos a importar. Descarga la plantilla para ver el formato requerido.")
+        st.info("Sube uno o varios archivos CSV, Excel, JSON (o JSON Lines), Parquet o Arrow, o un ZIP que los contenga, con la lista de dispositivos a importar. Descarga la plantilla para ver el formato requerido.")
         if st.button("Cancelar importación", key="cancel_import"):
             # Save current weight state before canceling
             current_weight_mode = st.session_state.get('weight_mode_radio')
@@ -173,23 +180,43 @@ with import_container:
             st.session_state['ahp_weights'] = current_ahp_weights
             st.session_state['manual_weights'] = current_manual_weights
             st.session_state.show_import = False
-            st.session_state['imported_devices'] = []
+            st.session_state['imported_devices'] = PendingImports()
             if 'import_message' in st.session_state:
                 del st.session_state['import_message']
             st.rerun()
-        import_file = st.file_uploader("Selecciona el archivo", type=["csv", "xlsx", "json"], key="import_csv")
-        if import_file is not None:
+        import_files = st.file_uploader(
+            "Selecciona uno o varios archivos (o un ZIP con varios archivos)",
+            type=["csv", "xlsx", "json", "jsonl", "ndjson", "parquet", "arrow", "feather", "zip"],
+            accept_multiple_files=True,
+            key="import_csv"
+        )
+        if import_files:
             try:
-                import_df = read_devices_file(import_file)
+                # Files are parsed concurrently; the bar advances as each one finishes
+                progress = st.progress(0.0, text="Leyendo archivos...")
+
+                def report_progress(done, total, file_name, error):
+                    status = f"❌ {file_name}" if error else f"✅ {file_name}"
+                    progress.progress(done / total, text=f"{status} ({done}/{total} archivos)")
+
+                import_result = read_devices_files(import_files, on_progress=report_progress)
+                import_df = import_result.valid_devices
+                # Rows that fail validation are reported and left out of the import
+                st.session_state['import_errors'] = import_result.errors
+                rejected = len(import_result.devices) - len(import_df)
                 if len(import_df) > 0:
-                    imported = import_df.to_dict(orient='records')
-                    for d in imported:
-                        d['_import_hash'] = str(uuid.uuid4())
-                    st.session_state['imported_devices'] = imported
+                    st.session_state['imported_devices'] = PendingImports(import_df)
                     if 'import_csv' in st.session_state:
                         del st.session_state['import_csv']
                     st.session_state['show_import'] = False
-                    st.session_state['import_message'] = f"✅ Archivo '{import_file.name}' leído correctamente. Se encontraron {len(import_df)} dispositivos.\n\nAhora puedes añadirlos individualmente o todos al sistema usando los botones correspondientes."
+                    files_label = f"Archivo '{import_files[0].name}' leído" if len(import_files) == 1 else f"{len(import_files)} archivos leídos"
+                    st.session_state['import_message'] = f"✅ {files_label} correctamente. Se encontraron {len(import_df)} dispositivos válidos.\n\nAhora puedes añadirlos individualmente o todos al sistema usando los botones correspondientes."
+
+                    if rejected:
+                        st.session_state['import_message'] += f"\n\n⚠️ {rejected} filas no se importaron por contener errores (ver detalle abajo)."
+                    unreadable_files = int((import_result.errors['fila'] == 0).sum())
+                    if unreadable_files:
+                        st.session_state['import_message'] += f"\n\n⚠️ {unreadable_files} archivos no se pudieron leer (ver detalle abajo)."
 
                     # --- SAVE AND RESTORE WEIGHT STATE ---
                     current_weight_mode = st.session_state.get('weight_mode_radio')
@@ -211,14 +238,24 @@ with import_container:
                     # --- END RESTORE WEIGHT STATE ---
 
                     st.rerun()
+                elif len(import_result.errors) > 0:
+                    st.session_state['imported_devices'] = PendingImports()
+                    st.error("❌ No se encontró ningún dispositivo válido. Revisa los errores y vuelve a subir los archivos.")
                 else:
-                    st.session_state['imported_devices'] = []
+                    st.session_state['imported_devices'] = PendingImports()
                     st.warning("⚠️ El archivo está vacío. No se encontraron dispositivos para importar.")
             except Exception as e:
-                st.session_state['imported_devices'] = []
+                st.session_state['imported_devices'] = PendingImports()
                 print(f"Error al leer el archivo: {str(e)}")
                 st.error(f"❌ Error al leer el archivo: {str(e)}")
 
+    # Per-row validation errors of the last import
+    import_errors = st.session_state.get('import_errors')
+    if import_errors is not None and len(import_errors) > 0:
+        rows_with_errors = len(import_errors.drop_duplicates(['archivo', 'fila']))
+        with st.expander(f"⚠️ Errores de validación de la importación ({rows_with_errors} filas)"):
+            st.dataframe(import_errors, use_container_width=True, hide_index=True)
+
     # Show imported devices list even if show_import is False
     if 'imported_devices' in st.session_state and st.session_state['imported_devices']:
         st.markdown('---')
@@ -229,20 +266,24 @@ with import_container:
         ### Dispositivos importados pendientes de añadir
         Revisa los datos principales de cada dispositivo. Puedes ver los detalles completos haciendo clic en \"Ver detalles\". Selecciona los pesos antes de añadir cada dispositivo al sistema.
         """)
-        for idx, device in enumerate(st.session_state['imported_devices']):
+        pending = st.session_state['imported_devices']
+        name_filter = st.text_input("Filtrar dispositivos importados por nombre", key="import_filter")
+        shown = pending.filter(name_filter)
+        for import_hash in shown:
+            device = pending.get(import_hash)
             with st.container():
                 col1, col2, col3 = st.columns([5, 1, 1])
                 name = device.get('name', 'Sin nombre')
                 power = device.get('power', 'N/A')
                 life = device.get('life', 'N/A')
                 col1.markdown(f"**{name}** | Potencia: {power} W | Vida útil: {life} años")
-                key_exp = f"expand_imported_{idx}"
+                key_exp = f"expand_imported_{import_hash}"
                 if key_exp not in st.session_state:
                     st.session_state[key_exp] = False
-                if col2.button("Ver detalles" if not st.session_state[key_exp] else "Ocultar detalles", key=f"btn_details_import_{idx}"):
+                if col2.button("Ver detalles" if not st.session_state[key_exp] else "Ocultar detalles", key=f"btn_details_import_{import_hash}"):
                     st.session_state[key_exp] = not st.session_state[key_exp]
                     st.rerun()
-                if col3.button("Añadir dispositivo al sistema", key=f"btn_add_import_{idx}"):
+                if col3.button("Añadir dispositivo al sistema", key=f"btn_add_import_{import_hash}"):
                     # Save current weight state
                     current_weight_mode = st.session_state.weight_mode_radio
                     current_ahp_weights = st.session_state.get('ahp_weights', None)
@@ -252,74 +293,8 @@ with import_container:
                     if current_weight_mode == "Ajuste Manual":
                         for k in METRIC_NAMES:
                             individual_manual_weights[k] = st.session_state.get(f"manual_weight_{k}")
-                    # Get active weights
-                    if current_weight_mode == "Calcular nuevos pesos":
-                        if current_ahp_weights:
-                            user_weights = current_ahp_weights
-                            weights_config_name = "Pesos Calculados"
-                            for ahp_config_name, config in st.session_state.ahp_configurations.items():
-                                if to_dict_flat(config['weights']) == to_dict_flat(user_weights):
-                                    weights_config_name = f"Configuración Calculada: {ahp_config_name}"
-                                    break
-                        else:
-                            user_weights = RECOMMENDED_WEIGHTS
-                            weights_config_name = "Pesos Recomendados"
-                    elif current_weight_mode == "Ajuste Manual":
-                        manual_weights = {k: st.session_state[f"manual_weight_{k}"] for k in METRIC_NAMES}
-                        user_weights, _ = validate_manual_weights(manual_weights)
-                        weights_config_name = "Pesos Manuales Personalizados"
-                        for manual_config_name, config in st.session_state.saved_weights.items():
-                            normalized_config = {k: float(v) for k, v in config.items()}
-                            total = sum(normalized_config.values())
-                            if total != 1.0:
-                                normalized_config = {k: v/total for k, v in normalized_config.items()}
-                            if to_dict_flat(normalized_config) == to_dict_flat(user_weights):
-                                weights_config_name = f"Configuración Manual: {manual_config_name}"
-                                break
-                    else:  # Pesos Recomendados
-                        user_weights = RECOMMENDED_WEIGHTS
-                        weights_config_name = "Pesos Recomendados"                    
-                    sensor = IoTSustainability(name)
-                    sensor.weights = {k: float(extract_weight_value(v)) for k, v in user_weights.items()}
-                    sensor.calculate_energy_consumption(
-                        float(device.get('power', 0)),
-                        float(device.get('hours', 0)),
-                        float(device.get('days', 0))
-                    )
-                    sensor.calculate_carbon_footprint()
-                    sensor.calculate_ewaste(
-                        float(device.get('weight', 0)),
-                        float(device.get('life', 0))
-                    )
-                    sensor.calculate_renewable_energy(float(device.get('renewable_energy', 0)))
-                    sensor.calculate_energy_efficiency(float(device.get('functionality', 0)))
-                    sensor.calculate_durability(float(device.get('life', 0)))
-                    sensor.calculate_recyclability(float(device.get('recyclability', 0)))
-                    sensor.calculate_maintenance_index(
-                        int(device.get('B', 0)),
-                        float(device.get('Wb', 0)),
-                        int(device.get('M', 0)),
-                        int(device.get('C', 0)),
-                        float(device.get('Wc', 0)),
-                        float(device.get('W0', 0)),
-                        float(device.get('W', 0))
-                    )
-                    result = sensor.calculate_sustainability()
-                    device_data = device.copy()
-                    device_data.update({
-                        "id": str(uuid.uuid4()),
-                        "calculation_done": True,
-                        "used_weights": user_weights,
-                        "result": result,
-                        "snapshot_form": device.copy(),
-                        "weights_snapshot": create_weights_snapshot(user_weights, current_weight_mode)
-                    })
-                    st.session_state.devices.append(device_data)
-                    update_device_selection()  # Update selection when adding device
-                    st.session_state['imported_devices'] = [d for d in st.session_state['imported_devices'] if d.get('_import_hash') != device.get('_import_hash')]
-                    for var in ["global_result", "global_calculation_date"]:
-                        if var in st.session_state:
-                            del st.session_state[var]
+                    add_imported_devices([import_hash], current_weight_mode)
+                    del st.session_state[key_exp]
                     if 'import_message' in st.session_state:
                         del st.session_state['import_message']
                     # Restore weight state
@@ -338,9 +313,13 @@ with import_container:
                     st.write(device)
         st.info("Cuando estés listo, podrás añadir los dispositivos individualmente o todos juntos al sistema. Recuerda seleccionar los pesos antes de añadirlos.")
 
-        # Button to add all imported devices to the system
-        if st.session_state['imported_devices']:
-            if st.button("Añadir todos los dispositivos importados al sistema", key="btn_add_all_importados"):
+        # Button to add all imported devices (or those matching the filter) to the system
+        if shown:
+            add_all_label = (
+                f"Añadir los {len(shown)} dispositivos filtrados al sistema" if name_filter
+                else "Añadir todos los dispositivos importados al sistema"
+            )
+            if st.button(add_all_label, key="btn_add_all_importados"):
                 # Save current weight state
                 current_weight_mode = st.session_state.weight_mode_radio
                 current_ahp_weights = st.session_state.get('ahp_weights', None)
@@ -349,82 +328,11 @@ with import_container:
                 if current_weight_mode == "Ajuste Manual":
                     for k in METRIC_NAMES:
                         individual_manual_weights[k] = st.session_state.get(f"manual_weight_{k}")
-                new_devices = []
-                for device in st.session_state['imported_devices']:
-                    name = device.get('name', 'Sin nombre')
-                    # Get active weights
-                    if current_weight_mode == "Calcular nuevos pesos":
-                        if current_ahp_weights:
-                            user_weights = current_ahp_weights
-                            weights_config_name = "Pesos Calculados"
-                            for ahp_config_name, config in st.session_state.ahp_configurations.items():
-                                if to_dict_flat(config['weights']) == to_dict_flat(user_weights):
-                                    weights_config_name = f"Configuración Calculada: {ahp_config_name}"
-                                    break
-                        else:
-                            user_weights = RECOMMENDED_WEIGHTS
-                            weights_config_name = "Pesos Recomendados"
-                    elif current_weight_mode == "Ajuste Manual":
-                        manual_weights = {k: st.session_state[f"manual_weight_{k}"] for k in METRIC_NAMES}
-                        user_weights, _ = validate_manual_weights(manual_weights)
-                        weights_config_name = "Pesos Manuales Personalizados"
-                        for manual_config_name, config in st.session_state.saved_weights.items():
-                            # Normalize saved configuration before comparing
-                            normalized_config = {k: float(v) for k, v in config.items()}
-                            total = sum(normalized_config.values())
-                            if total != 1.0:
-                                normalized_config = {k: v/total for k, v in normalized_config.items()}
-                            if to_dict_flat(normalized_config) == to_dict_flat(user_weights):
-                                weights_config_name = f"Configuración Manual: {manual_config_name}"
-                                break
-                    else:
-                        user_weights = RECOMMENDED_WEIGHTS
-                        weights_config_name = "Pesos Recomendados"
-
-                    sensor = IoTSustainability(name)
-                    sensor.weights = {k: float(extract_weight_value(v)) for k, v in user_weights.items()}
-                    sensor.calculate_energy_consumption(
-                        float(device.get('power', 0)),
-                        float(device.get('hours', 0)),
-                        float(device.get('days', 0))
-                    )
-                    sensor.calculate_carbon_footprint()
-                    sensor.calculate_ewaste(
-                        float(device.get('weight', 0)),
-                        float(device.get('life', 0))
-                    )
-                    sensor.calculate_renewable_energy(float(device.get('renewable_energy', 0)))
-                    sensor.calculate_energy_efficiency(float(device.get('functionality', 0)))
-                    sensor.calculate_durability(float(device.get('life', 0)))
-                    sensor.calculate_recyclability(float(device.get('recyclability', 0)))
-                    sensor.calculate_maintenance_index(
-                        int(device.get('B', 0)),
-                        float(device.get('Wb', 0)),
-                        int(device.get('M', 0)),
-                        int(device.get('C', 0)),
-                        float(device.get('Wc', 0)),
-                        float(device.get('W0', 0)),
-                        float(device.get('W', 0))
-                    )
-                    result = sensor.calculate_sustainability()
-                    device_data = device.copy()
-                    device_data.update({
-                        "id": str(uuid.uuid4()),
-                        "calculation_done": True,
-                        "used_weights": user_weights,
-                        "result": result,
-                        "snapshot_form": device.copy(),
-                        "weights_snapshot": create_weights_snapshot(user_weights, current_weight_mode)
-                    })
-                    new_devices.append(device_data)
-                st.session_state.devices.extend(new_devices)
-                update_device_selection()  # Update selection when adding devices
-                st.session_state['imported_devices'] = []
+                add_imported_devices(shown, current_weight_mode)
+                for import_hash in shown:
+                    st.session_state.pop(f"expand_imported_{import_hash}", None)
                 if 'import_message' in st.session_state:
                     del st.session_state['import_message']
-                for var in ["global_result", "global_calculation_date"]:
-                    if var in st.session_state:
-                        del st.session_state[var]
                 # Restore weight state
                 st.session_state.weight_mode_radio = current_weight_mode
                 if current_ahp_weights:
@@ -439,7 +347,8 @@ with import_container:
 
         # Button to clean imported devices list
         if st.button("Limpiar lista de dispositivos importados", key="btn_limpiar_importados"):
-            st.session_state['imported_devices'] = []
+            st.session_state['imported_devices'] = PendingImports()
+            st.session_state.pop('import_errors', None)
             if 'import_message' in st.session_state:
                 del st.session_state['import_message']
                 st.rerun()
@@ -488,21 +397,15 @@ with col2:
     user_weights = show_weights_interface()
 
 if submitted:
-    # Eliminate only global results and date, NOT AHP weights
-    for var in ["global_result", "global_calculation_date"]:
-        if var in st.session_state:
-            del st.session_state[var]
-
     # Determine active weights and configuration name at this moment
     if st.session_state.weight_mode_radio == "Calcular nuevos pesos":
         if 'ahp_weights' in st.session_state:
             user_weights = st.session_state.ahp_weights
             # Search for active calculated configuration name
             weights_config_name = "Pesos Calculados"
-            for ahp_config_name, config in st.session_state.ahp_configurations.items():
-                if to_dict_flat(config['weights']) == to_dict_flat(user_weights):
-                    weights_config_name = f"Configuración Calculada: {ahp_config_name}"
-                    break
+            ahp_config_name = find_config_name('ahp', user_weights)
+            if ahp_config_name is not None:
+                weights_config_name = f"Configuración Calculada: {ahp_config_name}"
         else:
             st.warning("No hay pesos AHP calculados. Se usarán los pesos recomendados.")
             user_weights = RECOMMENDED_WEIGHTS
@@ -512,15 +415,9 @@ if submitted:
         user_weights, _ = validate_manual_weights(manual_weights)
         # Search for active manual configuration name
         weights_config_name = "Pesos Manuales Personalizados"
-        for manual_config_name, config in st.session_state.saved_weights.items():
-            # Normalize saved configuration before comparing
-            normalized_config = {k: float(v) for k, v in config.items()}
-            total = sum(normalized_config.values())
-            if total != 1.0:
-                normalized_config = {k: v/total for k, v in normalized_config.items()}
-            if to_dict_flat(normalized_config) == to_dict_flat(user_weights):
-                weights_config_name = f"Configuración Manual: {manual_config_name}"
-                break
+        manual_config_name = find_config_name('manual', user_weights)
+        if manual_config_name is not None:
+            weights_config_name = f"Configuración Manual: {manual_config_name}"
     else:
         user_weights = RECOMMENDED_WEIGHTS
         weights_config_name = "Pesos Recomendados"
@@ -573,7 +470,7 @@ if submitted:
     }
 
     st.session_state.devices.append(dispositivo_data)
-    update_device_selection()  # Update selection when adding device
+    refresh_global_result()
 
     st.success(f"Dispositivo '{name}' añadido correctamente. Presiona 'Calcular Índice de Sostenibilidad Total' para ver los resultados.")
     st.rerun()
@@ -587,61 +484,44 @@ if st.session_state.devices:
     col_sel1, col_sel2, col_sel3 = st.columns([1, 1, 2])
     with col_sel1:
         if st.button("Seleccionar Todos"):
-            st.session_state.selected_devices = {
-                d['id']: True for d in st.session_state.devices
-            }
+            st.session_state.devices.select_all(True)
+            refresh_global_result()
             st.rerun()
     with col_sel2:
         if st.button("Deseleccionar Todos"):
-            st.session_state.selected_devices = {
-                d['id']: False for d in st.session_state.devices
-            }
+            st.session_state.devices.select_all(False)
+            refresh_global_result()
             st.rerun()
     with col_sel3:
-        num_selected = sum(st.session_state.selected_devices.values())
+        num_selected = st.session_state.devices.selected_count
         st.markdown(f"**Dispositivos seleccionados para el cálculo global:** {num_selected}/{len(st.session_state.devices)}")
 
-    # Show individual results for all devices
-    for idx, device in enumerate(st.session_state.devices):
-        # If no result exists, recalculate using saved weights
-        if "result" not in device or not device["calculation_done"]:
-            sensor = IoTSustainability(device["name"])
-            sensor.weights = {k: float(extract_weight_value(v)) for k, v in device["used_weights"].items()}
-            sensor.calculate_energy_consumption(device["power"], device["hours"], device["days"])
-            sensor.calculate_carbon_footprint()
-            sensor.calculate_ewaste(device["weight"], device["life"])
-            sensor.calculate_renewable_energy(device["renewable_energy"])
-            sensor.calculate_energy_efficiency(device["functionality"])
-            sensor.calculate_durability(device["life"])
-            sensor.calculate_recyclability(device["recyclability"])
-            sensor.calculate_maintenance_index(
-                device["B"], device["Wb"], device["M"], device["C"], device["Wc"], device["W0"], device["W"]
-            )
-            result = sensor.calculate_sustainability()
-            device["result"] = result
-            device["calculation_done"] = True
-        
+    # Re-score all devices with the active weights (no metric recalculation needed)
+    if st.button(
+        "Aplicar pesos activos a todos los dispositivos",
+        help="Recalcula el índice de todos los dispositivos con la configuración de pesos seleccionada actualmente."
+    ):
+        weights_snapshot = create_weights_snapshot(user_weights, st.session_state.weight_mode_radio)
+        st.session_state.devices.apply_weights(user_weights, weights_snapshot)
+        refresh_global_result()
+        st.rerun()
+
+    # Show individual results for all devices (results are stored with each device)
+    for device in st.session_state.devices:
         # Show summary and control buttons
         with st.container():
             col_res, col_sel, col_btn_det = st.columns([4, 1, 1])
             
-            # Checkbox for selection
+            # Checkbox for selection (updates the global result incrementally)
+            is_selected = st.session_state.devices.is_selected(device['id'])
             if col_sel.checkbox(
                 "Include in calculation",
-                value=st.session_state.selected_devices.get(device['id'], True),
+                value=is_selected,
                 key=f"sel_{device['id']}"
-            ):
-                if not st.session_state.selected_devices.get(device['id'], False):
-                    st.session_state.selected_devices[device['id']] = True
-                    if 'global_result' in st.session_state:
-                        del st.session_state.global_result
-                    st.rerun()
-            else:
-                if st.session_state.selected_devices.get(device['id'], True):
-                    st.session_state.selected_devices[device['id']] = False
-                    if 'global_result' in st.session_state:
-                        del st.session_state.global_result
-                    st.rerun()
+            ) != is_selected:
+                st.session_state.devices.set_selected(device['id'], not is_selected)
+                refresh_global_result()
+                st.rerun()
             
             # Device summary
             col_res.markdown(f"**{device['name']}** — Índice: {device['result']['sustainability_index']:.2f}/10")
@@ -667,45 +547,13 @@ if st.session_state.devices:
         st.button("🌍 Calcular Índice Global de Sostenibilidad", disabled=True)
     else:
         if st.button("🌍 Calcular Índice Global de Sostenibilidad"):
-            selected_devices = get_selected_devices()
-            if not selected_devices:
+            # The fleet keeps running sums over the selected devices, so this is O(1)
+            global_result = st.session_state.devices.global_result()
+            if global_result is None:
                 st.warning("No hay dispositivos seleccionados para el cálculo global.")
             else:
-                total_indices = []
-                total_metrics = []
-
-                for device in selected_devices:
-                    if "result" not in device or not device["calculation_done"]:
-                        sensor = IoTSustainability(device["name"])
-                        sensor.weights = {k: float(extract_weight_value(v)) for k, v in device["used_weights"].items()}
-                        sensor.calculate_energy_consumption(device["power"], device["hours"], device["days"])
-                        sensor.calculate_carbon_footprint()
-                        sensor.calculate_ewaste(device["weight"], device["life"])
-                        sensor.calculate_renewable_energy(device["renewable_energy"])
-                        sensor.calculate_energy_efficiency(device["functionality"])
-                        sensor.calculate_durability(device["life"])
-                        sensor.calculate_recyclability(device["recyclability"])
-                        sensor.calculate_maintenance_index(
-                            device["B"], device["Wb"], device["M"], 
-                            device["C"], device["Wc"], device["W0"], device["W"]
-                        )
-                        result = sensor.calculate_sustainability()
-                        device["result"] = result
-                        device["calculation_done"] = True
-
-                    total_indices.append(device["result"]["sustainability_index"])
-                    total_metrics.append(device["result"]["normalized_metrics"])
-
-                total_average = sum(total_indices) / len(total_indices)
-                metrics_average = {
-                    key: sum(m[key] for m in total_metrics) / len(total_metrics)
-                    for key in total_metrics[0]
-                }
-                st.session_state.global_result = {
-                    "total_average": total_average,
-                    "metrics_average": metrics_average,
-                    "included_devices": selected_devices
-                }
+                st.session_state.global_result = global_result
+                st.session_state.global_calculation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 st.success("Resultados actualizados correctamente.")
 
     # Space after button
@@ -718,7 +566,7 @@ show_global_results()
 if st.session_state.get('global_result'):
     st.markdown('---')
     buffer = export_results_excel()
-    included_devices = len(st.session_state.global_result['included_devices'])
+    included_devices = st.session_state.global_result['device_count']
     st.download_button(
         label='⬇️ Descargar resultados globales (Excel)',
         data=buffer,
@@ -731,11 +579,13 @@ if st.session_state.get('devices'):
     st.markdown('---')
     with st.expander('⬇️ Descargar lista de dispositivos añadidos'):
         only_selected = st.checkbox("Incluir solo dispositivos seleccionados para el cálculo global")
-        format = st.selectbox('Selecciona el formato de descarga:', ['Excel (.xlsx)', 'CSV (.csv)', 'JSON (.json)'], key='formato_descarga_devices')
+        format = st.selectbox('Selecciona el formato de descarga:', ['Excel (.xlsx)', 'CSV (.csv)', 'JSON (.json)', 'Parquet (.parquet)', 'Arrow IPC (.arrow)'], key='formato_descarga_devices')
         formats_map = {
             'Excel (.xlsx)': 'excel',
             'CSV (.csv)': 'csv',
-            'JSON (.json)': 'json'
+            'JSON (.json)': 'json',
+            'Parquet (.parquet)': 'parquet',
+            'Arrow IPC (.arrow)': 'arrow'
         }
         export_format = formats_map[format]
         devices_export = get_selected_devices() if only_selected else st.session_state.devices
@@ -761,6 +611,20 @@ if st.session_state.get('devices'):
                 file_name=f'dispositivos_{len(devices_export)}_{datetime.now().strftime("%Y%m%d")}.json',
                 mime='application/json'
             )
+        elif export_format == 'parquet':
+            st.download_button(
+                label='Descargar lista de dispositivos añadidos (Parquet)',
+                data=buffer,
+                file_name=f'dispositivos_{len(devices_export)}_{datetime.now().strftime("%Y%m%d")}.parquet',
+                mime='application/vnd.apache.parquet'
+            )
+        elif export_format == 'arrow':
+            st.download_button(
+                label='Descargar lista de dispositivos añadidos (Arrow IPC)',
+                data=buffer,
+                file_name=f'dispositivos_{len(devices_export)}_{datetime.now().strftime("%Y%m%d")}.arrow',
+                mime='application/vnd.apache.arrow.file'
+            )
 
 # --- FOOTER SECTION ---
 st.markdown(
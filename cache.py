@@ -0,0 +1,123 @@
+# cache.py
+import os
+import json
+import hashlib
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+# Decimals kept when hashing, so that values equal up to float noise share a key
+KEY_DECIMALS = 12
+
+def content_key(values, decimals=KEY_DECIMALS):
+    """Canonical hash of an array (e.g. a comparison matrix or a weight vector).
+
+    Values are rounded to `decimals` and hashed together with the shape, so equal
+    contents give the same key regardless of how the array was built.
+    """
+    array = np.round(np.asarray(values, dtype=float), decimals) + 0.0  # -0.0 -> 0.0
+    digest = hashlib.sha1(str(array.shape).encode())
+    digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+class ContentCache:
+    """LRU cache keyed by content_key(), with an optional on-disk tier.
+
+    Args:
+        maxsize (int): Entries kept in memory; the least recently used is evicted
+        directory (str): Optional folder where every entry is also stored as JSON;
+            entries evicted from memory are reloaded from it
+        encode (callable): Converts a value to JSON-serializable data for the disk tier
+            (identity by default)
+        decode (callable): Rebuilds a value from the data written by encode
+    """
+    def __init__(self, maxsize=256, directory=None, encode=None, decode=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda data: data)
+        self._entries = OrderedDict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key, default=None):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        if self.directory:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    value = self.decode(json.load(f))
+            except (OSError, ValueError, KeyError, TypeError):
+                # Missing, truncated or stale entries count as misses
+                return default
+            self._store(key, value)
+            return value
+        return default
+
+    def put(self, key, value):
+        self._store(key, value)
+        if self.directory:
+            tmp = None
+            try:
+                data = json.dumps(self.encode(value))
+                os.makedirs(self.directory, exist_ok=True)
+                # Write to a temporary file and swap it in, so readers never see a partial entry
+                fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp, self._path(key))
+            except (OSError, TypeError, ValueError):
+                # The memory tier still holds the entry
+                if tmp is not None and os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._entries or bool(self.directory and os.path.exists(self._path(key)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Empties the memory tier (files on disk are kept)."""
+        self._entries.clear()
+
+class ConfigIndex:
+    """Maps the content keys of saved weight configurations to their names in O(1).
+
+    When several configurations share the same weights, the first one saved wins,
+    as the linear scans this replaces did.
+    """
+    def __init__(self):
+        self._names = {}
+        self._keys = {}
+
+    def add(self, name, key):
+        self.remove(name)
+        self._keys[name] = key
+        self._names.setdefault(key, name)
+
+    def remove(self, name):
+        key = self._keys.pop(name, None)
+        if key is None or self._names.get(key) != name:
+            return
+        del self._names[key]
+        # Hand the key over to the next configuration with the same weights, if any
+        for other, other_key in self._keys.items():
+            if other_key == key:
+                self._names[key] = other
+                break
+
+    def find(self, key):
+        """Returns the name of the configuration with this key, or None."""
+        return self._names.get(key)
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,76 @@
+# cli.py
+"""Headless scoring of device files, for batch jobs outside the Streamlit dashboard.
+
+Usage:
+    python cli.py dispositivos.csv -o resultados.csv --global-output global.json --errors-output errores.csv --workers 8
+
+Rows that fail the import validation are not scored: they are counted in the
+summary ('rejected_count') and, with --errors-output, listed with their reasons.
+"""
+import argparse
+import json
+import sys
+import time
+from contextlib import closing
+
+from services.import_service import DEFAULT_CHUNK_ROWS, expand_archives, iter_devices_file
+from services.scoring_service import score_stream
+from utils.constants import RECOMMENDED_WEIGHTS
+
+def load_weights(path):
+    """Loads a weights configuration from a JSON file ({metric: weight}) or returns the recommended weights."""
+    if path is None:
+        return RECOMMENDED_WEIGHTS
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def iter_input_frames(file, chunk_rows):
+    """Streams the chunks of the input file, or of every supported file inside a ZIP archive, in order."""
+    for member in expand_archives([file]):
+        yield from iter_devices_file(member, chunk_rows)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Calcula el índice de sostenibilidad de una lista de dispositivos IoT."
+    )
+    parser.add_argument("input", help="Archivo de dispositivos (CSV, Excel, JSON, JSON Lines, Parquet o Arrow, o un ZIP que los contenga) con las columnas de la plantilla")
+    parser.add_argument("-o", "--output", help="Archivo CSV de resultados por dispositivo (si se omite, solo se calcula el índice global)")
+    parser.add_argument("-g", "--global-output", help="Archivo JSON con el índice global (por defecto se imprime)")
+    parser.add_argument("-e", "--errors-output", help="Archivo CSV con las filas rechazadas por la validación y el motivo")
+    parser.add_argument("-w", "--weights", help="Archivo JSON con los pesos por métrica (por defecto, pesos recomendados)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Número de procesos para archivos grandes (por defecto, uno por núcleo)")
+    parser.add_argument("--parallel-min-rows", type=int, default=None, help="Filas del primer bloque a partir de las cuales se usan varios procesos (por defecto, el punto de equilibrio medido)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_ROWS, help="Filas leídas y procesadas por bloque")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    weights = load_weights(args.weights)
+    start = time.perf_counter()
+
+    try:
+        # closing() stops the reader before the file is closed, also on errors
+        with open(args.input, 'rb') as file, closing(iter_input_frames(file, args.chunk_size)) as frames:
+            summary = score_stream(
+                frames, weights, output=args.output, workers=args.workers,
+                errors_output=args.errors_output, min_rows=args.parallel_min_rows
+            )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    summary_json = json.dumps(summary, indent=2, ensure_ascii=False, allow_nan=False)
+    if args.global_output:
+        with open(args.global_output, 'w', encoding='utf-8') as f:
+            f.write(summary_json)
+    else:
+        print(summary_json)
+
+    elapsed = time.perf_counter() - start
+    print(f"{summary['device_count']} dispositivos procesados en {elapsed:.2f} s", file=sys.stderr)
+    if summary['rejected_count']:
+        detail = f" (detalle en {args.errors_output})" if args.errors_output else " (use --errors-output para ver el detalle)"
+        print(f"{summary['rejected_count']} filas rechazadas por errores de validación{detail}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,11 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from components.charts import radar_chart
-from utils.constants import METRIC_NAMES_ES
+from utils.constants import METRIC_NAMES_ES, RECOMMENDED_WEIGHTS, EXPORT_COLUMN_MAPPING
+from sensitivity import perturb_weights, sensitivity_sweep
+from uncertainty import propagate_uncertainty
+from fleet import weights_vector
+from utils.state import refresh_global_result
 
 def show_device(device, idx):
     """Shows the chart, recommendations and complete details of the device."""
@@ -117,9 +121,10 @@ def show_device(device, idx):
         if st.checkbox('Eliminar dispositivo', key=delete_key):
             st.warning('¿Estás seguro de que deseas eliminar este dispositivo? Esta acción no se puede deshacer.')
             if st.button('Confirmar eliminación', key=f'confirmar_{device["id"]}'):
-                st.session_state.devices = [d for d in st.session_state.devices if d["id"] != device["id"]]
-                # Delete global results and related variables whenever a device is deleted
-                for var in ["global_result", "global_calculation_date", "show_ahp_weights_table", "ahp_weights", "ahp_results"]:
+                st.session_state.devices.remove(device["id"])
+                # The global result is updated incrementally; AHP results are discarded
+                refresh_global_result()
+                for var in ["show_ahp_weights_table", "ahp_weights", "ahp_results"]:
                     if var in st.session_state:
                         del st.session_state[var]
                 st.success(f"Dispositivo '{name}' eliminado correctamente.")
@@ -160,13 +165,13 @@ def show_global_results():
     # --- System details ---
     with st.expander("Detalles del sistema"):
         devices = st.session_state.devices
-        included_devices = [d for d in devices if st.session_state.selected_devices.get(d['id'], True)]
+        included_rows = devices.selected_rows()
         
-        st.markdown(f"**Cantidad total de dispositivos evaluados:** {len(included_devices)}")
-        if len(devices) != len(included_devices):
-            st.info(f"⚠️ Nota: {len(devices) - len(included_devices)} dispositivos fueron excluidos del cálculo.")
+        st.markdown(f"**Cantidad total de dispositivos evaluados:** {len(included_rows)}")
+        if len(devices) != len(included_rows):
+            st.info(f"⚠️ Nota: {len(devices) - len(included_rows)} dispositivos fueron excluidos del cálculo.")
             
-        indices = [d['result']['sustainability_index'] for d in included_devices if 'result' in d]
+        indices = devices.sustainability_index[included_rows]
         if len(indices) > 1:
             std = np.std(indices)
             st.markdown(f"**Desviación estándar de los índices individuales:** {std:.2f}")
@@ -177,7 +182,7 @@ def show_global_results():
             st.session_state.global_calculation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         st.markdown(f"**Fecha y hora del cálculo global:** {st.session_state.global_calculation_date}")
         
-        used_weights = [str(d.get('used_weights', {})) for d in included_devices]
+        used_weights = [str(devices.meta(row).get('used_weights', {})) for row in included_rows]
         if len(set(used_weights)) > 1:
             st.warning("Atención: los dispositivos fueron evaluados con diferentes configuraciones de pesos. Los índices individuales pueden no ser directamente comparables.")
         
@@ -245,12 +250,123 @@ def show_global_results():
         """)
             
         st.markdown("**Dispositivos incluidos en el cálculo global**")
-        if included_devices:
+        if len(included_rows):
             device_data = {
-                'Nombre': [d['name'] for d in included_devices],
-                'Índice de Sostenibilidad': [float(d['result']['sustainability_index']) if 'result' in d else None for d in included_devices]
+                'Nombre': [devices.meta(row).get('name') for row in included_rows],
+                'Índice de Sostenibilidad': indices
             }
+            # Weights calculated from comparison ranges: index range of each device over the weight bounds
+            bounds = st.session_state.get('ahp_weight_bounds')
+            if bounds and st.session_state.get('weight_mode_radio') == "Calcular nuevos pesos":
+                index_min, index_max = devices.index_range(bounds['lower'], bounds['upper'])
+                device_data['Índice mínimo (rangos AHP)'] = index_min[included_rows]
+                device_data['Índice máximo (rangos AHP)'] = index_max[included_rows]
             df_devices = pd.DataFrame(device_data)
-            st.dataframe(df_devices.style.format({'Índice de Sostenibilidad': '{:.2f}'}), use_container_width=True)
+            st.dataframe(df_devices.style.format({
+                'Índice de Sostenibilidad': '{:.2f}',
+                'Índice mínimo (rangos AHP)': '{:.2f}',
+                'Índice máximo (rangos AHP)': '{:.2f}'
+            }), use_container_width=True)
         else:
-            st.info('No hay dispositivos incluidos actualmente.') 
\ No newline at end of file
+            st.info('No hay dispositivos incluidos actualmente.')
+
+    show_sensitivity_analysis()
+    show_uncertainty_analysis()
+
+def show_sensitivity_analysis():
+    """Shows how the ranking of the selected devices changes when the weights vary."""
+    devices = st.session_state.devices
+    included_rows = devices.selected_rows()
+    if len(included_rows) < 2:
+        return
+    with st.expander("Análisis de sensibilidad de pesos"):
+        st.markdown("""
+        Evalúa los dispositivos seleccionados con miles de configuraciones de pesos generadas alrededor
+        de los pesos base, para ver qué tan estable es el índice y la posición de cada dispositivo.
+        """)
+        base_options = {"Pesos Recomendados": RECOMMENDED_WEIGHTS}
+        if st.session_state.get('ahp_weights'):
+            base_options["Pesos Calculados"] = st.session_state.ahp_weights
+        col1, col2, col3 = st.columns(3)
+        base_name = col1.selectbox("Pesos base", list(base_options.keys()), key="sensitivity_base")
+        n_samples = col2.number_input("Número de configuraciones", min_value=100, max_value=20000, value=2000, step=100, key="sensitivity_samples")
+        spread = col3.select_slider("Variación de los pesos", options=["Baja", "Media", "Alta"], value="Media", key="sensitivity_spread")
+        if st.button("Ejecutar análisis de sensibilidad"):
+            concentration = {"Baja": 500.0, "Media": 100.0, "Alta": 20.0}[spread]
+            base_weights = base_options[base_name]
+            samples = perturb_weights(base_weights, n_samples=int(n_samples), concentration=concentration)
+            sweep = sensitivity_sweep(devices.normalized_metrics[included_rows], samples, base_weights=base_weights)
+            df_sensitivity = pd.DataFrame({
+                'Nombre': [devices.meta(row).get('name') for row in included_rows],
+                'Índice base': sweep['base_index'],
+                'Índice medio': sweep['index_mean'],
+                'Índice P5': sweep['index_p05'],
+                'Índice P95': sweep['index_p95'],
+                'Posición base': sweep['base_rank'],
+                'Posición media': sweep['rank_mean'],
+                'Posición mín.': sweep['rank_min'],
+                'Posición máx.': sweep['rank_max'],
+                'Estabilidad de la posición (%)': sweep['rank_stability'] * 100
+            }).sort_values('Posición base')
+            st.dataframe(
+                df_sensitivity.style.format({
+                    'Índice base': '{:.2f}', 'Índice medio': '{:.2f}', 'Índice P5': '{:.2f}',
+                    'Índice P95': '{:.2f}', 'Posición media': '{:.1f}', 'Estabilidad de la posición (%)': '{:.1f}'
+                }),
+                use_container_width=True
+            )
+
+def show_uncertainty_analysis():
+    """Shows Monte Carlo confidence intervals for the indices of the selected devices."""
+    devices = st.session_state.devices
+    included_rows = devices.selected_rows()
+    if len(included_rows) == 0:
+        return
+    with st.expander("Análisis de incertidumbre de los datos de entrada"):
+        st.markdown("""
+        Trata los datos de entrada seleccionados como estimaciones con una incertidumbre relativa y
+        propaga esa incertidumbre hasta el índice mediante simulación Monte Carlo.
+        """)
+        fields = st.multiselect(
+            "Campos con incertidumbre",
+            list(EXPORT_COLUMN_MAPPING.keys())[1:],
+            default=['power', 'hours', 'life', 'W0', 'W'],
+            format_func=lambda k: EXPORT_COLUMN_MAPPING[k],
+            key="uncertainty_fields"
+        )
+        col1, col2, col3 = st.columns(3)
+        distribution = col1.selectbox(
+            "Distribución", ["normal", "lognormal", "uniform", "triangular"], key="uncertainty_distribution",
+            help="Para incertidumbres amplias use lognormal: nunca produce valores negativos. "
+                 "En todas las distribuciones los valores simulados se mantienen dentro del rango válido de cada campo."
+        )
+        spread = col2.number_input("Incertidumbre relativa (%)", min_value=1.0, max_value=100.0, value=10.0, step=1.0, key="uncertainty_spread") / 100
+        n_samples = col3.number_input("Muestras por dispositivo", min_value=100, max_value=10000, value=1000, step=100, key="uncertainty_samples")
+        if st.button("Ejecutar análisis de incertidumbre") and fields:
+            spec = (distribution, spread, spread) if distribution == "triangular" else (distribution, spread)
+            columns = {field: devices.column(field)[included_rows] for field in EXPORT_COLUMN_MAPPING if field != 'name'}
+            weights = np.array([weights_vector(devices.meta(row)['used_weights']) for row in included_rows])
+            progress = st.progress(0.0, text="Simulando...")
+            result = propagate_uncertainty(
+                columns, {field: spec for field in fields}, weights=weights, n_samples=int(n_samples),
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Simulando... {done}/{total} dispositivos")
+            )
+            progress.empty()
+            st.metric(
+                "Índice de Sostenibilidad Global (IC 95%)",
+                f"{result['global_mean']:.2f}/10",
+                help=f"Intervalo de confianza del 95%: {result['global_lower']:.2f} - {result['global_upper']:.2f}"
+            )
+            st.markdown(f"**Intervalo de confianza del 95% del índice global:** {result['global_lower']:.2f} - {result['global_upper']:.2f}")
+            df_uncertainty = pd.DataFrame({
+                'Nombre': [devices.meta(row).get('name') for row in included_rows],
+                'Índice nominal': devices.sustainability_index[included_rows],
+                'Índice medio': result['index_mean'],
+                'IC 95% inferior': result['index_lower'],
+                'IC 95% superior': result['index_upper'],
+                'Desviación estándar': result['index_std']
+            })
+            st.dataframe(df_uncertainty.style.format({
+                'Índice nominal': '{:.2f}', 'Índice medio': '{:.2f}', 'IC 95% inferior': '{:.2f}',
+                'IC 95% superior': '{:.2f}', 'Desviación estándar': '{:.3f}'
+            }), use_container_width=True)
@@ -3,7 +3,8 @@ import uuid
 from utils.constants import FORM_KEYS, METRIC_NAMES, RECOMMENDED_WEIGHTS
 from model import IoTSustainability
 from weights import validate_manual_weights
-from utils.helpers import to_dict_flat, create_weights_snapshot
+from utils.helpers import create_weights_snapshot
+from utils.state import refresh_global_result
 
 def initialize_form():
     """Initializes form state variables."""
@@ -137,19 +138,10 @@ def show_device_form():
 
 def process_form(form_data):
     """Processes form data and updates application state."""
-    # Delete only global results and date, NOT AHP weights
-    for var in ["global_result", "global_calculation_date"]:
-        if var in st.session_state:
-            del st.session_state[var]
-
     # Determine active weights and configuration name at this moment
     if st.session_state.weight_mode_radio == "Calcular nuevos pesos":
         if 'ahp_weights' in st.session_state:
             user_weights = st.session_state.ahp_weights
-            # Find active calculated configuration name
-            for config in st.session_state.ahp_configurations.items():
-                if to_dict_flat(config['weights']) == to_dict_flat(user_weights):
-                    break
         else:
             st.warning("No hay pesos AHP calculados. Se usarán los pesos recomendados.")
             user_weights = RECOMMENDED_WEIGHTS
@@ -157,10 +149,6 @@ def process_form(form_data):
     elif st.session_state.weight_mode_radio == "Ajuste Manual":
         manual_weights = {k: st.session_state[f"manual_weight_{k}"] for k in METRIC_NAMES}
         user_weights, _ = validate_manual_weights(manual_weights)
-        # Find active manual configuration name
-        for config in st.session_state.saved_weights.items():
-            if to_dict_flat(config) == to_dict_flat(user_weights):
-                break
     else:
         user_weights = RECOMMENDED_WEIGHTS
 
@@ -200,5 +188,6 @@ def process_form(form_data):
     }
 
     st.session_state.devices.append(device_data)
+    refresh_global_result()
     st.success(f"Dispositivo '{form_data['name']}' añadido correctamente. Presiona 'Calcular Índice de Sostenibilidad Total' para ver los resultados.")
     st.rerun() 
\ No newline at end of file
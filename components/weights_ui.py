@@ -1,11 +1,16 @@
 import streamlit as st
-import pandas as pd
 from utils.constants import METRIC_NAMES, RECOMMENDED_WEIGHTS
-from utils.helpers import to_dict_flat
-from weights import validate_manual_weights
+from utils.helpers import to_dict_flat, find_config_name, register_config, unregister_config, weights_frame
+from weights import validate_manual_weights, weights_from_ranking
+
+def clear_ranking_agreement():
+    """Forgets the ranking agreement once the weights come from another source."""
+    st.session_state.pop('ranking_agreement', None)
+    st.session_state.pop('ranking_weights', None)
 
 def reset_manual_weights():
     """Resets manual weights to recommended values."""
+    clear_ranking_agreement()
     # reset manual weights dictionary
     st.session_state.manual_weights = RECOMMENDED_WEIGHTS
     # reset individual weights
@@ -15,17 +20,10 @@ def reset_manual_weights():
 def show_recommended_weights():
     """Shows the interface for recommended weights."""  
     user_weights = RECOMMENDED_WEIGHTS
+    clear_ranking_agreement()
     st.success("Se han cargado los pesos recomendados del modelo AHP+ODS.")
 
-    weights_df = pd.DataFrame.from_dict(user_weights, orient='index', columns=['Peso'])
-    weights_df.index = weights_df.index.map(METRIC_NAMES)
-    weights_df = weights_df.rename_axis('Métrica').reset_index()
-    
-    # Add relative importance column
-    weights_df['Importancia'] = weights_df['Peso'].apply(
-        lambda x: '🔴 Alta' if x >= 0.20 else '🟡 Media' if 0.10 < x < 0.20 else '🟢 Baja'
-    )
-    
+    weights_df = weights_frame(user_weights)
     st.dataframe(weights_df.style.format({'Peso': '{:.3f}'}), use_container_width=True)
 
     with st.expander("Ver explicación del modelo AHP+ODS"):
@@ -64,6 +62,48 @@ def show_recommended_weights():
         - Representa la importancia relativa de cada métrica dentro del índice de sostenibilidad ambiental
         """)
 
+def apply_ranking_weights(ranked_ids):
+    """Learns weights from the ranked devices and loads them into the manual inputs."""
+    fleet = st.session_state.devices
+    rows = [fleet.row(device_id) for device_id in ranked_ids]
+    weights, agreement = weights_from_ranking(fleet.normalized_metrics[rows], range(len(rows)))
+    # Runs as a callback, before the inputs are drawn
+    st.session_state.manual_weights = weights.copy()
+    for k, v in weights.items():
+        st.session_state[f"manual_weight_{k}"] = float(v)
+    st.session_state.ranking_agreement = agreement
+    st.session_state.ranking_weights = weights
+
+def show_ranking_weights():
+    """Shows the interface to learn weights from an expert ranking of devices."""
+    with st.expander("Aprender pesos a partir de un ranking de dispositivos"):
+        fleet = st.session_state.devices
+        if len(fleet) < 2:
+            st.info("Añada al menos dos dispositivos para ordenarlos y aprender pesos a partir del ranking.")
+            return
+        names = {device_id: fleet.meta(fleet.row(device_id))['name'] for device_id in fleet.ids}
+        ranked_ids = st.multiselect(
+            "Seleccione los dispositivos de referencia en orden, del más sostenible al menos sostenible",
+            options=list(names.keys()),
+            format_func=lambda device_id: names[device_id],
+            key="ranking_devices"
+        )
+        st.button(
+            "Calcular pesos desde el ranking",
+            disabled=len(ranked_ids) < 2,
+            on_click=apply_ranking_weights,
+            args=(ranked_ids,)
+        )
+        # The agreement only describes the learned weights, not later edits of the inputs
+        learned = st.session_state.get('ranking_weights', {})
+        if any(abs(st.session_state.get(f"manual_weight_{k}", v) - v) > 1e-9 for k, v in learned.items()):
+            clear_ranking_agreement()
+        if 'ranking_agreement' in st.session_state:
+            st.success(
+                f"Pesos cargados en el ajuste manual. Reproducen el "
+                f"{st.session_state.ranking_agreement:.0%} de las comparaciones del ranking."
+            )
+
 def show_manual_adjustment():
     """Shows the interface for manual weight adjustment."""
     st.info("""
@@ -83,6 +123,7 @@ def show_manual_adjustment():
             if 'saved_weights' not in st.session_state:
                 st.session_state.saved_weights = {}
             st.session_state.saved_weights[new_name] = current_config
+            register_config('manual', new_name)
             # Keep current values in state
             st.session_state.manual_weights = current_config.copy()
             st.success(f"Configuración '{new_name}' guardada correctamente.")
@@ -93,6 +134,7 @@ def show_manual_adjustment():
             config_cols = st.columns(2)
             if config_cols[0].button("Aplicar configuración"):
                 selected_config = st.session_state.saved_weights[selection]
+                clear_ranking_agreement()
                 # Update manual weights dictionary
                 st.session_state.manual_weights = selected_config.copy()
                 # Update individual weights
@@ -103,6 +145,7 @@ def show_manual_adjustment():
                 st.success(f"Configuración '{selection}' aplicada correctamente.")
                 st.rerun()
             if config_cols[1].button("Eliminar configuración"):
+                unregister_config('manual', selection)
                 del st.session_state.saved_weights[selection]
                 st.success(f"Configuración '{selection}' eliminada correctamente.")
                 st.rerun()
@@ -110,6 +153,8 @@ def show_manual_adjustment():
             reset_manual_weights()
             st.rerun()
 
+    show_ranking_weights()
+
     # Active configuration message before manual inputs
     current_weights = {k: st.session_state.get(f"manual_weight_{k}", 0) for k in METRIC_NAMES}
     recommended_weights = RECOMMENDED_WEIGHTS
@@ -118,10 +163,9 @@ def show_manual_adjustment():
     else:
         # Check if current weights match any saved configuration
         active_config_name = "Pesos Manuales Personalizados"
-        for config_name, config in st.session_state.saved_weights.items():
-            if to_dict_flat(config) == to_dict_flat(current_weights):
-                active_config_name = f"Configuración Manual: {config_name}"
-                break
+        config_name = find_config_name('manual', current_weights)
+        if config_name is not None:
+            active_config_name = f"Configuración Manual: {config_name}"
         st.success(f"**Configuración activa: {active_config_name}**")
 
     user_weights = {}
@@ -166,6 +210,7 @@ def show_manual_adjustment():
 
 def show_calculated_weights():
     """Shows the interface for AHP calculated weights."""
+    clear_ranking_agreement()
     st.info("""
     **Matriz de Comparación por Pares:**
     - Este método le permite comparar la importancia relativa de cada par de métricas
@@ -178,10 +223,9 @@ def show_calculated_weights():
     # Show active configuration if there are calculated weights
     if 'ahp_weights' in st.session_state and st.session_state.ahp_weights is not None:
         config_name = "Pesos Calculados"  # default value
-        for config_name, config in st.session_state.ahp_configurations.items():
-            if to_dict_flat(config['weights']) == to_dict_flat(st.session_state.ahp_weights):
-                config_name = f"Configuración Calculada: {config_name}"
-                break
+        ahp_config_name = find_config_name('ahp', st.session_state.ahp_weights)
+        if ahp_config_name is not None:
+            config_name = f"Configuración Calculada: {ahp_config_name}"
         st.success(f"**Configuración activa:** {config_name}")
     
     if st.button("Editar matriz de comparación por pares"):
@@ -192,33 +236,7 @@ def show_calculated_weights():
     # Show calculated weights summary table if they exist
     if 'ahp_weights' in st.session_state and st.session_state.ahp_weights is not None:
         # Show only weights table without message
-        weights = st.session_state.ahp_weights
-        clean_weights = {}
-        for k, v in weights.items():
-            if isinstance(v, dict):
-                val = list(v.values())[0]
-            elif isinstance(v, pd.Series):
-                val = v.iloc[0]
-            else:
-                val = v
-            try:
-                clean_weights[k] = float(val)
-            except (ValueError, TypeError):
-                continue
-        
-        # Create DataFrame with weights
-        metrics_list = list(clean_weights.keys())
-        weights_list = [float(clean_weights[k]) for k in metrics_list]
-        names_list = [METRIC_NAMES[k] for k in metrics_list]
-        weights_df = pd.DataFrame({
-            'Métrica': names_list,
-            'Peso': weights_list
-        })
-        
-        # Add relative importance column with balanced criteria
-        weights_df['Importancia'] = weights_df['Peso'].apply(
-            lambda x: '🔴 Alta' if x >= 0.20 else '🟡 Media' if 0.10 < x < 0.20 else '🟢 Baja'
-        )
+        weights_df = weights_frame(st.session_state.ahp_weights)
         st.dataframe(weights_df.style.format({'Peso': '{:.3f}'}), use_container_width=True)
         
         # Add expander for calculated weights configuration management
@@ -230,9 +248,11 @@ def show_calculated_weights():
                 current_config = {
                     'weights': st.session_state.ahp_weights,
                     'rc': st.session_state.ahp_results['rc'] if 'ahp_results' in st.session_state else None,
-                    'matrix': st.session_state.comparison_matrix.copy()
+                    'matrix': st.session_state.comparison_matrix.copy(),
+                    'bounds': st.session_state.get('ahp_weight_bounds')
                 }
                 st.session_state.ahp_configurations[new_name] = current_config
+                register_config('ahp', new_name)
                 st.success(f"Configuración '{new_name}' guardada correctamente.")
                 st.rerun()
             if st.session_state.ahp_configurations:
@@ -240,8 +260,13 @@ def show_calculated_weights():
                 config_cols = st.columns(2)
                 if config_cols[0].button("Aplicar configuración"):
                     config = st.session_state.ahp_configurations[selection]
+                    clear_ranking_agreement()
                     st.session_state.ahp_weights = config['weights']
                     st.session_state.comparison_matrix = config['matrix']
+                    if config.get('bounds'):
+                        st.session_state.ahp_weight_bounds = config['bounds']
+                    else:
+                        st.session_state.pop('ahp_weight_bounds', None)
                     if 'ahp_results' not in st.session_state:
                         st.session_state.ahp_results = {}
                     st.session_state.ahp_results['weights'] = config['weights']
@@ -249,6 +274,7 @@ def show_calculated_weights():
                     st.success(f"Configuración '{selection}' aplicada correctamente.")
                     st.rerun()
                 if config_cols[1].button("Eliminar configuración"):
+                    unregister_config('ahp', selection)
                     del st.session_state.ahp_configurations[selection]
                     st.success(f"Configuración '{selection}' eliminada correctamente.")
                     st.rerun()
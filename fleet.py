@@ -0,0 +1,493 @@
+# fleet.py
+import uuid
+import numpy as np
+import pandas as pd
+from utils.constants import DEVICE_FIELD_TYPES
+from metrics import METRIC_CODES
+
+# NumPy dtype used to store each numeric device field
+FIELD_DTYPES = {
+    field: np.int64 if cast is int else np.float64
+    for field, cast in DEVICE_FIELD_TYPES.items()
+}
+
+def weights_vector(weights):
+    """Converts a weights dict (plain or AHP {'weight': value} entries) to an array in METRIC_CODES order."""
+    vector = []
+    for metric in METRIC_CODES:
+        value = weights[metric]
+        if isinstance(value, dict):
+            value = list(value.values())[0]
+        vector.append(float(value))
+    return np.array(vector)
+
+def index_range(normalized_matrix, weights_lower, weights_upper):
+    """Lowest and highest index of each device over all weights within bounds.
+
+    The weights range over {lower <= w <= upper, sum(w) = 1}. Starting from the
+    lower bounds, the remaining budget 1 - sum(lower) goes greedily to the metrics
+    with the lowest (for the minimum) or highest (for the maximum) normalized value
+    of each device, which solves both linear programs exactly (fractional knapsack).
+
+    Args:
+        normalized_matrix (np.ndarray): (devices x metrics) normalized metrics
+        weights_lower, weights_upper: Weight bounds (dicts or arrays in METRIC_CODES order),
+            e.g. from weights.interval_ahp
+
+    Returns:
+        tuple: (min index array, max index array)
+    """
+    lower = weights_vector(weights_lower) if isinstance(weights_lower, dict) else np.asarray(weights_lower, dtype=float)
+    upper = weights_vector(weights_upper) if isinstance(weights_upper, dict) else np.asarray(weights_upper, dtype=float)
+    budget = 1.0 - lower.sum()
+    if budget < -1e-12 or upper.sum() < 1.0 - 1e-12:
+        raise ValueError("Los límites de los pesos no admiten pesos que sumen 1.")
+    normalized_matrix = np.asarray(normalized_matrix, dtype=float)
+    base = normalized_matrix @ lower
+    capacity = upper - lower
+
+    bounds = []
+    for order in (np.argsort(normalized_matrix, axis=1), np.argsort(-normalized_matrix, axis=1)):
+        values = np.take_along_axis(normalized_matrix, order, axis=1)
+        room = capacity[order]
+        # Budget left before each metric in the order, then what that metric takes
+        before = np.cumsum(room, axis=1) - room
+        allocation = np.clip(budget - before, 0.0, room)
+        bounds.append(base + (allocation * values).sum(axis=1))
+    return bounds[0], bounds[1]
+
+class FleetAggregate:
+    """Running sums of the sustainability index and normalized metrics.
+
+    Lets the global result (averages over the selected devices) be kept up to
+    date in O(1) per added, removed, edited or (de)selected device.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.index_sum = 0.0
+        self.metrics_sum = np.zeros(len(METRIC_CODES))
+
+    def add(self, index, normalized, count=1):
+        """Adds one device, or a batch when `index` and `normalized` are summed over `count` devices."""
+        self.count += count
+        self.index_sum += index
+        self.metrics_sum += normalized
+
+    def remove(self, index, normalized, count=1):
+        """Removes the contribution of one device (or of a summed batch)."""
+        self.count -= count
+        if self.count == 0:
+            # Drop the rounding residue left by repeated additions and subtractions
+            self.reset()
+            return
+        self.index_sum -= index
+        self.metrics_sum -= normalized
+
+    def result(self):
+        """Returns the global result dict, or None if no device is selected."""
+        if self.count == 0:
+            return None
+        metrics_average = self.metrics_sum / self.count
+        return {
+            "total_average": self.index_sum / self.count,
+            "metrics_average": dict(zip(METRIC_CODES, metrics_average.tolist())),
+            "device_count": self.count
+        }
+
+class DeviceFleet:
+    """Columnar store for the devices added to the dashboard.
+
+    Numeric inputs and results live in typed NumPy arrays (one row per device),
+    while the name, weights and snapshots are kept in per-row metadata dicts.
+    An id -> row index gives O(1) lookup, update and delete. Deleting moves the
+    last row into the freed slot; iteration still follows insertion order.
+
+    Column views returned by column(), raw_metrics, normalized_metrics and
+    sustainability_index share memory with the store and are only valid until
+    the next append, which may reallocate the arrays.
+
+    Devices are selected for the global index when added. A FleetAggregate over
+    the selected rows is updated on every change, so global_result() is O(1).
+    """
+    def __init__(self, capacity=16):
+        self._size = 0
+        self._next_seq = 0
+        self._ids = []
+        self._meta = []
+        self._index = {}
+        self._seq = np.zeros(capacity, dtype=np.int64)
+        self._columns = {field: np.zeros(capacity, dtype=dtype) for field, dtype in FIELD_DTYPES.items()}
+        self._raw = np.zeros((capacity, len(METRIC_CODES)))
+        self._normalized = np.zeros((capacity, len(METRIC_CODES)))
+        self._scores = np.zeros(capacity)
+        self._selected = np.zeros(capacity, dtype=bool)
+        self._aggregate = FleetAggregate()
+
+    # --- Storage management ---
+    def _capacity(self):
+        return len(self._scores)
+
+    def _reserve(self, extra):
+        """Grows the arrays (doubling) so that `extra` more rows fit."""
+        needed = self._size + extra
+        capacity = self._capacity()
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+
+        def grow(array):
+            new = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            new[:self._size] = array[:self._size]
+            return new
+
+        self._seq = grow(self._seq)
+        self._columns = {field: grow(array) for field, array in self._columns.items()}
+        self._raw = grow(self._raw)
+        self._normalized = grow(self._normalized)
+        self._scores = grow(self._scores)
+        self._selected = grow(self._selected)
+
+    def _copy_row(self, src, dst):
+        self._seq[dst] = self._seq[src]
+        for array in self._columns.values():
+            array[dst] = array[src]
+        self._raw[dst] = self._raw[src]
+        self._normalized[dst] = self._normalized[src]
+        self._scores[dst] = self._scores[src]
+        self._selected[dst] = self._selected[src]
+
+    def _add_to_aggregate(self, row):
+        if self._selected[row]:
+            self._aggregate.add(self._scores[row], self._normalized[row])
+
+    def _remove_from_aggregate(self, row):
+        if self._selected[row]:
+            self._aggregate.remove(self._scores[row], self._normalized[row])
+
+    def _rebuild_aggregate(self):
+        """Recomputes the running sums from the columns in one vectorized pass."""
+        self._aggregate.reset()
+        mask = self.selected_mask
+        count = int(mask.sum())
+        if count:
+            self._aggregate.add(
+                self.sustainability_index[mask].sum(),
+                self.normalized_metrics[mask].sum(axis=0),
+                count
+            )
+
+    def _write_row(self, row, device):
+        for field, cast in DEVICE_FIELD_TYPES.items():
+            self._columns[field][row] = cast(device.get(field, 0))
+        result = device['result']
+        self._raw[row] = [result['raw_metrics'][m] for m in METRIC_CODES]
+        self._normalized[row] = [result['normalized_metrics'][m] for m in METRIC_CODES]
+        self._scores[row] = result['sustainability_index']
+        self._meta[row] = {
+            k: v for k, v in device.items()
+            if k not in DEVICE_FIELD_TYPES and k not in ('id', 'result')
+        }
+
+    # --- Mutation ---
+    def append(self, device):
+        """Adds a device in the dict format produced by the forms and returns its id.
+
+        The dict must carry a 'result' as returned by calculate_sustainability().
+        """
+        device_id = device.get('id') or str(uuid.uuid4())
+        if device_id in self._index:
+            raise ValueError(f"Ya existe un dispositivo con id {device_id}")
+        self._reserve(1)
+        row = self._size
+        self._ids.append(device_id)
+        self._meta.append(None)
+        self._write_row(row, device)
+        self._seq[row] = self._next_seq
+        self._next_seq += 1
+        self._selected[row] = True
+        self._add_to_aggregate(row)
+        self._index[device_id] = row
+        self._size += 1
+        return device_id
+
+    def extend(self, devices):
+        """Adds several devices in dict format and returns their ids."""
+        return [self.append(device) for device in devices]
+
+    def extend_columns(self, columns, fleet_result, metadata):
+        """Adds a batch of devices straight from columnar inputs and results.
+
+        Args:
+            columns: DataFrame or dict of array-likes with the device input fields
+            fleet_result (dict): Output of FleetSustainability.calculate_sustainability
+            metadata (list): One dict per device with the non-numeric data
+                (name, used_weights, snapshots...). An 'id' entry is used if present.
+
+        Returns:
+            list: The ids of the added devices
+        """
+        count = len(metadata)
+        ids = [meta.get('id') or str(uuid.uuid4()) for meta in metadata]
+        if len(set(ids)) != count or any(device_id in self._index for device_id in ids):
+            raise ValueError("Los ids de los dispositivos deben ser únicos")
+        self._reserve(count)
+        rows = slice(self._size, self._size + count)
+        for field, dtype in FIELD_DTYPES.items():
+            self._columns[field][rows] = np.asarray(columns[field]).astype(dtype)
+        self._raw[rows] = np.column_stack([fleet_result['raw_metrics'][m] for m in METRIC_CODES])
+        self._normalized[rows] = np.column_stack([fleet_result['normalized_metrics'][m] for m in METRIC_CODES])
+        self._scores[rows] = fleet_result['sustainability_index']
+        self._seq[rows] = np.arange(self._next_seq, self._next_seq + count)
+        self._next_seq += count
+        self._selected[rows] = True
+        if count:
+            self._aggregate.add(self._scores[rows].sum(), self._normalized[rows].sum(axis=0), count)
+        for offset, (device_id, meta) in enumerate(zip(ids, metadata)):
+            self._ids.append(device_id)
+            self._meta.append({k: v for k, v in meta.items() if k != 'id'})
+            self._index[device_id] = self._size + offset
+        self._size += count
+        return ids
+
+    def update(self, device_id, device):
+        """Replaces the data of an existing device, keeping its position."""
+        row = self._index[device_id]
+        self._remove_from_aggregate(row)
+        self._write_row(row, device)
+        self._add_to_aggregate(row)
+
+    def remove(self, device_id):
+        """Deletes a device in O(1) by moving the last row into its slot."""
+        row = self._index.pop(device_id)
+        self._remove_from_aggregate(row)
+        last = self._size - 1
+        if row != last:
+            self._copy_row(last, row)
+            self._ids[row] = self._ids[last]
+            self._meta[row] = self._meta[last]
+            self._index[self._ids[row]] = row
+        self._ids.pop()
+        self._meta.pop()
+        self._size -= 1
+
+    def clear(self):
+        """Removes every device."""
+        self.__init__()
+
+    def apply_weights(self, weights, weights_snapshot=None):
+        """Re-scores every device under a new weight configuration.
+
+        The normalized metrics do not depend on the weights, so the new indices
+        are a single matrix-vector product over the cached normalized matrix
+        (equal to the per-device weighted sum up to floating point rounding).
+
+        Args:
+            weights (dict): Metric code -> weight, stored as each device's used_weights
+            weights_snapshot (dict): Optional snapshot stored as each device's weights_snapshot
+        """
+        self._scores[:self._size] = self.normalized_metrics @ weights_vector(weights)
+        for meta in self._meta:
+            meta['used_weights'] = weights
+            if weights_snapshot is not None:
+                meta['weights_snapshot'] = weights_snapshot
+        self._rebuild_aggregate()
+
+    def index_range(self, weights_lower, weights_upper):
+        """Per-row (min, max) index over the weight bounds, see index_range()."""
+        return index_range(self.normalized_metrics, weights_lower, weights_upper)
+
+    def set_selected(self, device_id, selected):
+        """Includes or excludes a device from the global index in O(1)."""
+        row = self._index[device_id]
+        if self._selected[row] == selected:
+            return
+        if selected:
+            self._selected[row] = True
+            self._add_to_aggregate(row)
+        else:
+            self._remove_from_aggregate(row)
+            self._selected[row] = False
+
+    def select_all(self, selected=True):
+        """Includes or excludes every device from the global index."""
+        self._selected[:self._size] = selected
+        self._rebuild_aggregate()
+
+    # --- Access ---
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, device_id):
+        return device_id in self._index
+
+    def __iter__(self):
+        """Yields the devices, in dict format, in insertion order."""
+        for row in self.order():
+            yield self._device(row)
+
+    def row(self, device_id):
+        """Returns the row of a device in the column views."""
+        return self._index[device_id]
+
+    def get(self, device_id, default=None):
+        """Returns a device in dict format, or `default` if it does not exist."""
+        row = self._index.get(device_id)
+        if row is None:
+            return default
+        return self._device(row)
+
+    def is_selected(self, device_id):
+        """Returns whether a device is included in the global index."""
+        return bool(self._selected[self._index[device_id]])
+
+    @property
+    def selected_count(self):
+        return self._aggregate.count
+
+    @property
+    def selected_mask(self):
+        """Zero-copy view of the selection flag of every row."""
+        return self._selected[:self._size]
+
+    def selected_rows(self):
+        """Returns the rows of the selected devices, in insertion order."""
+        order = self.order()
+        return order[self.selected_mask[order]]
+
+    def selected_ids(self):
+        """Returns the ids of the selected devices, in insertion order."""
+        return [self._ids[row] for row in self.selected_rows()]
+
+    def global_result(self):
+        """Returns the averages over the selected devices (None if there are none)."""
+        return self._aggregate.result()
+
+    def meta(self, row):
+        """Returns the metadata dict (name, weights, snapshots) of a row."""
+        return self._meta[row]
+
+    def order(self):
+        """Returns the rows sorted by insertion order."""
+        return np.argsort(self._seq[:self._size], kind='stable')
+
+    @property
+    def ids(self):
+        """Device ids in insertion order."""
+        return [self._ids[row] for row in self.order()]
+
+    def column(self, field):
+        """Zero-copy view of an input field for every row."""
+        return self._columns[field][:self._size]
+
+    @property
+    def raw_metrics(self):
+        """Zero-copy (devices x metrics) view of the raw metrics, columns in METRIC_CODES order."""
+        return self._raw[:self._size]
+
+    @property
+    def normalized_metrics(self):
+        """Zero-copy (devices x metrics) view of the normalized metrics, columns in METRIC_CODES order."""
+        return self._normalized[:self._size]
+
+    @property
+    def sustainability_index(self):
+        """Zero-copy view of the sustainability index of every row."""
+        return self._scores[:self._size]
+
+    def input_frame(self, ids=None):
+        """Returns a DataFrame with the name and input fields, in insertion order.
+
+        Args:
+            ids (list): Optional subset of device ids to include
+        """
+        rows = self.order() if ids is None else np.array([self._index[i] for i in ids], dtype=np.int64)
+        data = {'name': [self._meta[row].get('name') for row in rows]}
+        for field in DEVICE_FIELD_TYPES:
+            data[field] = self._columns[field][rows]
+        return pd.DataFrame(data)
+
+    def _device(self, row):
+        """Materializes one row in the legacy device dict format."""
+        device = {'id': self._ids[row]}
+        device.update(self._meta[row])
+        for field, array in self._columns.items():
+            device[field] = array[row].item()
+        device['result'] = {
+            'raw_metrics': dict(zip(METRIC_CODES, self._raw[row].tolist())),
+            'normalized_metrics': dict(zip(METRIC_CODES, self._normalized[row].tolist())),
+            'sustainability_index': self._scores[row].item()
+        }
+        return device
+
+class PendingImports:
+    """Ordered queue of imported devices waiting to be added to the fleet.
+
+    The typed input columns of the imported file are kept as NumPy arrays and
+    each row gets an import hash. A hash -> row dict (which keeps insertion
+    order) gives O(1) lookup and removal, and any subset of rows can be handed
+    to the vectorized scoring in one call through columns(). The imported frame
+    is kept as is; per-device dicts are only built for the rows get() and
+    records() are asked for.
+    """
+    def __init__(self, devices=None):
+        devices = pd.DataFrame(columns=['name']) if devices is None else devices.reset_index(drop=True)
+        self._frame = devices
+        self._columns = {
+            field: (devices[field].to_numpy(dtype=dtype) if field in devices.columns else np.zeros(len(devices), dtype=dtype))
+            for field, dtype in FIELD_DTYPES.items()
+        }
+        names = devices['name'] if 'name' in devices.columns else pd.Series('', index=devices.index)
+        self._names = names.fillna('').astype(str).to_numpy()
+        self._index = {str(uuid.uuid4()): row for row in range(len(devices))}
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, import_hash):
+        return import_hash in self._index
+
+    def __iter__(self):
+        """Yields the import hashes in file order."""
+        return iter(list(self._index))
+
+    def get(self, import_hash):
+        """Imported data of one device (internal names), or None."""
+        row = self._index.get(import_hash)
+        return None if row is None else self._frame.iloc[[row]].to_dict(orient='records')[0]
+
+    def remove(self, import_hash):
+        self._index.pop(import_hash, None)
+
+    def remove_many(self, hashes):
+        for import_hash in hashes:
+            self._index.pop(import_hash, None)
+
+    def clear(self):
+        self._index.clear()
+
+    def _rows(self, hashes=None):
+        if hashes is None:
+            return np.fromiter(self._index.values(), dtype=np.int64, count=len(self._index))
+        return np.array([self._index[h] for h in hashes], dtype=np.int64)
+
+    def filter(self, text):
+        """Hashes of the pending devices whose name contains `text` (case-insensitive), in order."""
+        hashes = list(self._index)
+        if not text:
+            return hashes
+        names = pd.Series(self._names[self._rows()])
+        matches = names.str.contains(text, case=False, regex=False).to_numpy()
+        return [h for h, match in zip(hashes, matches) if match]
+
+    def columns(self, hashes=None):
+        """Typed input columns of the given devices (all pending by default), ready for scoring."""
+        rows = self._rows(hashes)
+        return {field: array[rows] for field, array in self._columns.items()}
+
+    def records(self, hashes=None):
+        """Imported data of the given devices (all pending by default), in the same order as columns()."""
+        return self._frame.iloc[self._rows(hashes)].to_dict(orient='records')
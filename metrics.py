@@ -0,0 +1,157 @@
+# metrics.py
+import numpy as np
+
+class Metric:
+    """Declaration of a sustainability metric.
+
+    Args:
+        code (str): Short metric code (e.g. 'EC')
+        inputs (list): Names of the device fields or other metric codes the formula reads
+        formula (callable): Vectorized function receiving the inputs (and params) as keyword arguments
+        reference (dict): {'min': ..., 'max': ...} range used for normalization
+        higher_is_worse (bool): True if larger raw values mean worse performance
+        params (dict): Named constants passed to the formula, overridable at evaluation time
+    """
+    def __init__(self, code, inputs, formula, reference, higher_is_worse=False, params=None):
+        self.code = code
+        self.inputs = list(inputs)
+        self.formula = formula
+        self.reference = reference
+        self.higher_is_worse = higher_is_worse
+        self.params = dict(params or {})
+
+class MetricRegistry:
+    """Ordered collection of metric declarations that compiles into an EvaluationPlan."""
+    def __init__(self):
+        self._metrics = {}
+        self._plan = None
+
+    def register(self, code, inputs, formula, reference, higher_is_worse=False, params=None):
+        """Adds (or replaces) a metric. Invalidates the compiled plan."""
+        self._metrics[code] = Metric(code, inputs, formula, reference, higher_is_worse, params)
+        self._plan = None
+
+    @property
+    def codes(self):
+        return list(self._metrics.keys())
+
+    def __getitem__(self, code):
+        return self._metrics[code]
+
+    def __iter__(self):
+        return iter(self._metrics.values())
+
+    def references(self):
+        """Returns the normalization ranges as {code: {'min', 'max'}}."""
+        return {m.code: dict(m.reference) for m in self}
+
+    def higher_is_worse(self):
+        """Returns the codes of the metrics where larger values are worse."""
+        return [m.code for m in self if m.higher_is_worse]
+
+    def compile(self):
+        """Returns the topologically ordered EvaluationPlan (compiled once and cached)."""
+        if self._plan is None:
+            self._plan = EvaluationPlan(self._metrics)
+        return self._plan
+
+class EvaluationPlan:
+    """Metric formulas in dependency order, evaluated column-wise over all devices."""
+    def __init__(self, metrics):
+        self.metrics = list(metrics.keys())
+        self._metrics = metrics
+        self.fields = sorted({
+            name for metric in metrics.values() for name in metric.inputs if name not in metrics
+        })
+
+        # Kahn's algorithm over the metric -> metric dependencies
+        pending = {code: {i for i in m.inputs if i in metrics} for code, m in metrics.items()}
+        self.order = []
+        while pending:
+            ready = [code for code, deps in pending.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependencias circulares entre métricas: {sorted(pending)}")
+            for code in ready:
+                del pending[code]
+                self.order.append(code)
+            for deps in pending.values():
+                deps.difference_update(ready)
+
+    def evaluate(self, columns, **params):
+        """Evaluates every metric for all devices.
+
+        Args:
+            columns: DataFrame or dict of array-likes with the device input fields
+            **params: Overrides for metric parameters (e.g. emission_factor=0.4)
+
+        Returns:
+            dict: Metric code -> array of raw values, in registration order
+        """
+        values = {field: np.asarray(columns[field], dtype=float) for field in self.fields}
+        # Invalid inputs (e.g. zero lifespan) yield inf/nan instead of raising
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for code in self.order:
+                metric = self._metrics[code]
+                kwargs = {name: values[name] for name in metric.inputs}
+                kwargs.update({k: params.get(k, v) for k, v in metric.params.items()})
+                values[code] = metric.formula(**kwargs)
+        return {code: values[code] for code in self.metrics}
+
+    def normalize(self, code, values):
+        """Normalizes raw values of one metric to the 0-10 scale (10 = best)."""
+        metric = self._metrics[code]
+        min_val = metric.reference['min']
+        max_val = metric.reference['max']
+        values = np.asarray(values, dtype=float)
+        with np.errstate(invalid='ignore'):
+            if metric.higher_is_worse:
+                scaled = 10 - (10 * (values - min_val) / (max_val - min_val))
+                return np.where(values >= max_val, 0.0, np.where(values <= min_val, 10.0, scaled))
+            scaled = 10 * (values - min_val) / (max_val - min_val)
+            return np.where(values <= min_val, 0.0, np.where(values >= max_val, 10.0, scaled))
+
+# Default metrics of the model. Formulas mirror the IoTSustainability.calculate_* methods.
+METRIC_REGISTRY = MetricRegistry()
+METRIC_REGISTRY.register(
+    'EC', ['power', 'hours', 'days'],
+    lambda power, hours, days: (power * hours * days) / 1000,
+    {'min': 0, 'max': 100}, higher_is_worse=True
+)
+METRIC_REGISTRY.register(
+    'CF', ['EC'],
+    lambda EC, emission_factor: EC * emission_factor,
+    {'min': 0, 'max': 25}, higher_is_worse=True, params={'emission_factor': 0.5}
+)
+METRIC_REGISTRY.register(
+    'EW', ['weight', 'life'],
+    lambda weight, life: weight / life,
+    {'min': 0, 'max': 2}, higher_is_worse=True
+)
+METRIC_REGISTRY.register(
+    'RE', ['renewable_energy'],
+    lambda renewable_energy: renewable_energy,
+    {'min': 0, 'max': 100}
+)
+METRIC_REGISTRY.register(
+    'EE', ['functionality', 'EC'],
+    lambda functionality, EC: (functionality * (10 - (np.minimum(EC, 100) / 10))) / 10,
+    {'min': 0, 'max': 10}
+)
+METRIC_REGISTRY.register(
+    'PD', ['life'],
+    lambda life: life,
+    {'min': 1, 'max': 10}
+)
+METRIC_REGISTRY.register(
+    'RC', ['recyclability'],
+    lambda recyclability: recyclability,
+    {'min': 0, 'max': 100}
+)
+METRIC_REGISTRY.register(
+    'MT', ['B', 'Wb', 'M', 'C', 'Wc', 'W0', 'W'],
+    lambda B, Wb, M, C, Wc, W0, W: (((B * Wb) + (M * C * Wc) + (W0 - W)) / W0) * 100,
+    {'min': 0, 'max': 100}, higher_is_worse=True
+)
+
+# Metric codes of the default model, in registration order
+METRIC_CODES = METRIC_REGISTRY.codes
@@ -1,3 +1,6 @@
+import numpy as np
+from metrics import METRIC_REGISTRY
+
 
 class IoTSustainability:
     def __init__(self, device_name):
@@ -13,16 +16,7 @@ class IoTSustainability:
             'RC': 0.05,
             'MT': 0.03
         }
-        self.references = {
-            'EC': {'min': 0, 'max': 100},
-            'CF': {'min': 0, 'max': 25},
-            'EW': {'min': 0, 'max': 2},
-            'RE': {'min': 0, 'max': 100},
-            'EE': {'min': 0, 'max': 10},
-            'PD': {'min': 1, 'max': 10},
-            'RC': {'min': 0, 'max': 100},
-            'MT': {'min': 0, 'max': 100}
-        }
+        self.references = METRIC_REGISTRY.references()
 
     def calculate_energy_consumption(self, power_W, daily_usage_hours, annual_usage_days):
         consumption_kWh = (power_W * daily_usage_hours * annual_usage_days) / 1000
@@ -75,7 +69,7 @@ class IoTSustainability:
         ref = self.references[metric_code]
         min_val = ref['min']
         max_val = ref['max']
-        if metric_code in ['EC', 'CF', 'EW', 'MT']:
+        if METRIC_REGISTRY[metric_code].higher_is_worse:
             if value >= max_val: return 0
             elif value <= min_val: return 10
             else: return 10 - (10 * (value - min_val) / (max_val - min_val))
@@ -99,4 +93,57 @@ class IoTSustainability:
             'raw_metrics': self.results,
             'normalized_metrics': normalized_metrics,
             'sustainability_index': sustainability_index
-        } 
\ No newline at end of file
+        }
+
+
+class FleetSustainability:
+    """Vectorized counterpart of IoTSustainability for scoring many devices at once.
+
+    Inputs are columns keyed by the internal device field names ('power', 'hours',
+    'days', 'weight', 'life', 'renewable_energy', 'functionality', 'recyclability',
+    'B', 'Wb', 'M', 'C', 'Wc', 'W0', 'W'), given as a DataFrame or a dict of
+    array-likes. Metrics are evaluated through the compiled plan of METRIC_REGISTRY,
+    whose formulas apply the same floating point operations, in the same order, as
+    the scalar methods, so results match the per-device path exactly.
+    """
+    def __init__(self, weights=None, registry=METRIC_REGISTRY):
+        self.plan = registry.compile()
+        self.weights = dict(weights) if weights is not None else IoTSustainability(None).weights
+        self.references = registry.references()
+
+    def calculate_metrics(self, columns, emission_factor=0.5):
+        """Calculates the raw value of every registered metric for every device.
+
+        Args:
+            columns: DataFrame or dict of array-likes with the device inputs
+            emission_factor (float): kg CO2eq emitted per kWh
+
+        Returns:
+            dict: Metric code -> array of raw values
+        """
+        return self.plan.evaluate(columns, emission_factor=emission_factor)
+
+    def normalize_metric(self, metric_code, values):
+        """Normalizes an array of raw values of one metric to the 0-10 scale."""
+        return self.plan.normalize(metric_code, values)
+
+    def calculate_sustainability(self, columns, emission_factor=0.5):
+        """Scores every device in a single vectorized pass.
+
+        Returns:
+            dict: 'raw_metrics' and 'normalized_metrics' (metric code -> array) and
+            'sustainability_index' (array), mirroring IoTSustainability.calculate_sustainability
+        """
+        raw_metrics = self.calculate_metrics(columns, emission_factor)
+        normalized_metrics = {
+            metric: self.normalize_metric(metric, values)
+            for metric, values in raw_metrics.items()
+        }
+        sustainability_index = np.zeros(np.shape(raw_metrics['EC']))
+        for metric in self.weights:
+            sustainability_index = sustainability_index + normalized_metrics[metric] * self.weights[metric]
+        return {
+            'raw_metrics': raw_metrics,
+            'normalized_metrics': normalized_metrics,
+            'sustainability_index': sustainability_index
+        }
@@ -0,0 +1,88 @@
+# sensitivity.py
+import numpy as np
+from fleet import weights_vector
+
+# Function to draw weight vectors on the simplex around a base configuration
+def perturb_weights(base_weights, n_samples=1000, concentration=200.0, seed=None):
+    """Draws perturbed weight vectors from a Dirichlet distribution centred on the base weights.
+
+    Args:
+        base_weights: Weights dict (recommended, manual or AHP) or array in METRIC_CODES order
+        n_samples (int): Number of weight vectors to draw
+        concentration (float): Higher values keep the samples closer to the base weights
+        seed (int): Optional seed for reproducibility
+
+    Returns:
+        np.ndarray: (n_samples x metrics) matrix whose rows sum to 1
+    """
+    if isinstance(base_weights, dict):
+        base = weights_vector(base_weights)
+    else:
+        base = np.asarray(base_weights, dtype=float)
+    base = base / base.sum()
+    rng = np.random.default_rng(seed)
+    # Small floor so that metrics with zero weight can still vary
+    alpha = np.maximum(concentration * base, 1e-3)
+    return rng.dirichlet(alpha, size=n_samples)
+
+def rank_devices(scores):
+    """Ranks the devices in each column of a (devices x samples) score matrix (1 = best)."""
+    scores = np.asarray(scores, dtype=float)
+    order = np.argsort(-scores, axis=0, kind='stable')
+    ranks = np.empty_like(order)
+    positions = np.broadcast_to(np.arange(1, scores.shape[0] + 1)[:, None], order.shape)
+    np.put_along_axis(ranks, order, positions, axis=0)
+    return ranks
+
+# Function to score a fleet under many weight vectors at once
+def sensitivity_sweep(normalized_matrix, weight_samples, base_weights=None, top_k=None, return_scores=False):
+    """Scores every device under every weight vector with a single matrix multiply.
+
+    Args:
+        normalized_matrix (np.ndarray): (devices x metrics) normalized metrics, e.g. DeviceFleet.normalized_metrics
+        weight_samples (np.ndarray): (samples x metrics) weight vectors, e.g. from perturb_weights()
+        base_weights: Reference weights (dict or array) used for the base ranking; defaults
+            to the mean of the samples
+        top_k (int): If given, also reports the probability of each device ranking in the top k
+        return_scores (bool): Include the full (devices x samples) score matrix in the result
+
+    Returns:
+        dict: Per-device arrays with the index distribution ('index_mean', 'index_std',
+        'index_p05', 'index_p50', 'index_p95') and rank stability ('base_index', 'base_rank',
+        'rank_mean', 'rank_std', 'rank_min', 'rank_max', 'rank_stability' = share of samples
+        that keep the base rank)
+    """
+    normalized_matrix = np.asarray(normalized_matrix, dtype=float)
+    weight_samples = np.atleast_2d(np.asarray(weight_samples, dtype=float))
+    if base_weights is None:
+        base = weight_samples.mean(axis=0)
+    elif isinstance(base_weights, dict):
+        base = weights_vector(base_weights)
+    else:
+        base = np.asarray(base_weights, dtype=float)
+
+    scores = normalized_matrix @ weight_samples.T
+    base_index = normalized_matrix @ base
+    ranks = rank_devices(scores)
+    base_rank = rank_devices(base_index[:, None])[:, 0]
+    p05, p50, p95 = np.percentile(scores, [5, 50, 95], axis=1)
+
+    result = {
+        'base_index': base_index,
+        'index_mean': scores.mean(axis=1),
+        'index_std': scores.std(axis=1),
+        'index_p05': p05,
+        'index_p50': p50,
+        'index_p95': p95,
+        'base_rank': base_rank,
+        'rank_mean': ranks.mean(axis=1),
+        'rank_std': ranks.std(axis=1),
+        'rank_min': ranks.min(axis=1),
+        'rank_max': ranks.max(axis=1),
+        'rank_stability': (ranks == base_rank[:, None]).mean(axis=1)
+    }
+    if top_k is not None:
+        result['top_k_probability'] = (ranks <= top_k).mean(axis=1)
+    if return_scores:
+        result['scores'] = scores
+    return result
@@ -2,56 +2,274 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from utils.constants import METRIC_NAMES
-from weights import ahp_attributes, consistency_ratio
+from utils.helpers import weights_frame
+from weights import (
+    AHPState,
+    ahp_eigen,
+    ahp_eigen_batch,
+    group_comparison_matrix,
+    repair_consistency_cached,
+    interval_ahp
+)
 
-def calculate_ahp_weights(metrics):
-    """Calculates weights using the AHP method from the comparison matrix."""
-    df_criteria = pd.DataFrame(
-        st.session_state.comparison_matrix,
-        index=metrics,
+def calculate_interval_ahp_weights(lower_matrix, upper_matrix, metrics):
+    """Calculates weight bounds and crisp weights from comparisons given as ranges.
+
+    Args:
+        lower_matrix, upper_matrix (array-like): Lower and upper comparison values;
+            cells compared with a single value have equal bounds
+        metrics (list): Metric codes, in matrix order
+
+    Returns:
+        tuple: (DataFrame with rows 'lower', 'weight' (crisp) and 'upper', one column per
+        metric; CR of the midpoint matrix)
+    """
+    weights_lower, weights_upper, crisp, rc = interval_ahp(lower_matrix, upper_matrix)
+    bounds = pd.DataFrame(
+        [weights_lower, crisp, weights_upper],
+        index=['lower', 'weight', 'upper'],
         columns=metrics
     )
-    weights = ahp_attributes(df_criteria)
-    ic, rc = consistency_ratio(weights, df_criteria, verbose=False)
-    return weights, ic, rc
+    return bounds, rc
+
+def get_ahp_state():
+    """Returns the AHP state of the comparison matrix, rebuilding it if the matrix was replaced."""
+    state = st.session_state.get('ahp_state')
+    if state is None or state.matrix is not st.session_state.comparison_matrix:
+        state = AHPState(st.session_state.comparison_matrix)
+        st.session_state.ahp_state = state
+    return state
+
+def publish_ahp_results(state, metrics, ranges=None):
+    """Stores the current solution of the AHP state as the calculated weights.
+
+    With comparison ranges (see active_comparison_ranges) the calculated weights are
+    the crisp interval AHP weights, and their bounds are stored under 'bounds'.
+    """
+    results = {
+        'weights': state.result.as_dict(metrics),
+        'ic': state.ci,
+        'rc': state.cr
+    }
+    if ranges is not None:
+        bounds, rc = calculate_interval_ahp_weights(ranges['lower'], ranges['upper'], metrics)
+        results['weights'] = bounds.loc['weight'].to_dict()
+        results['rc'] = rc
+        results['bounds'] = bounds
+    st.session_state.ahp_results = results
+
+def active_comparison_ranges(matrix):
+    """Returns the comparison ranges of the session if they still describe the matrix, or None.
+
+    Applied ranges set every cell to the geometric midpoint of its range; once a cell
+    is edited directly, or every range is a single value, the ranges no longer apply.
+    """
+    ranges = st.session_state.get('comparison_ranges')
+    if ranges is None or np.array_equal(ranges['lower'], ranges['upper']):
+        return None
+    if not np.allclose(np.sqrt(ranges['lower'] * ranges['upper']), matrix):
+        return None
+    return ranges
+
+def apply_comparison_ranges(table, metrics):
+    """Builds the bound matrices from the edited ranges table and sets each cell to its midpoint."""
+    n = len(metrics)
+    lower = np.ones((n, n))
+    upper = np.ones((n, n))
+    state = get_ahp_state()
+    for (i, j), low, high in zip(upper_pairs(n), table['Desde'], table['Hasta']):
+        low, high = sorted((float(low), float(high)))
+        lower[i, j], upper[i, j] = low, high
+        lower[j, i], upper[j, i] = 1 / high, 1 / low
+        state.set(i, j, float(np.sqrt(low * high)))
+        # Drop the input state so the widget is redrawn from the updated matrix
+        st.session_state.pop(f"matrix_{i}_{j}", None)
+    st.session_state.comparison_ranges = {'lower': lower, 'upper': upper}
+    st.session_state.pop('comparison_ranges_editor', None)
+
+def upper_pairs(n):
+    """(i, j) cells of the upper half of an n x n matrix, row by row."""
+    return [(i, j) for i in range(n) for j in range(i + 1, n)]
+
+def show_comparison_ranges(metrics):
+    """Lets reviewers give a comparison as a range ("between 3 and 5") instead of one value."""
+    names = [METRIC_NAMES[m] for m in metrics]
+    matrix = st.session_state.comparison_matrix
+    ranges = active_comparison_ranges(matrix)
+    with st.expander("Comparaciones por rango (AHP por intervalos)"):
+        st.markdown("""
+        Indique un rango cuando una comparación no tenga un único valor claro. Al aplicar los rangos,
+        cada celda de la matriz toma el punto medio geométrico de su rango y los pesos calculados pasan
+        a ser los pesos del AHP por intervalos, con su rango de variación. El rango del índice de cada
+        dispositivo se muestra en los resultados globales.
+        """)
+        pairs = upper_pairs(len(metrics))
+        table = pd.DataFrame({
+            'Métrica': [names[i] for i, _ in pairs],
+            'Comparada con': [names[j] for _, j in pairs],
+            'Desde': [(ranges['lower'] if ranges else matrix)[i, j] for i, j in pairs],
+            'Hasta': [(ranges['upper'] if ranges else matrix)[i, j] for i, j in pairs]
+        })
+        edited = st.data_editor(
+            table,
+            disabled=['Métrica', 'Comparada con'],
+            column_config={
+                'Desde': st.column_config.NumberColumn(min_value=0.11, max_value=9.0, step=0.01, format="%.2f"),
+                'Hasta': st.column_config.NumberColumn(min_value=0.11, max_value=9.0, step=0.01, format="%.2f")
+            },
+            hide_index=True,
+            use_container_width=True,
+            key="comparison_ranges_editor"
+        )
+        cols = st.columns(2)
+        if cols[0].button("Aplicar rangos"):
+            apply_comparison_ranges(edited, metrics)
+            st.rerun()
+        if ranges is not None and cols[1].button("Quitar rangos"):
+            st.session_state.pop('comparison_ranges', None)
+            st.session_state.pop('comparison_ranges_editor', None)
+            st.rerun()
+
+def calculate_panel_weights(matrices, metrics, reviewers=None):
+    """Calculates the AHP weights of a panel of reviewers and of their aggregated judgment.
+
+    Args:
+        matrices (array-like): (reviewers x metrics x metrics) stack of comparison matrices
+        metrics (list): Metric codes, in matrix order
+        reviewers (list): Optional reviewer names (numbered from 1 by default)
+
+    Returns:
+        tuple: (DataFrame with one row per reviewer: weight per metric, 'ic' and 'rc';
+        AHPResult of the aggregated group matrix)
+    """
+    matrices = np.asarray(matrices, dtype=float)
+    weights, _, ic, rc = ahp_eigen_batch(matrices)
+    reviewers = reviewers if reviewers is not None else [f"Revisor {i + 1}" for i in range(len(matrices))]
+    panel = pd.DataFrame(weights, index=reviewers, columns=metrics)
+    panel['ic'] = ic
+    panel['rc'] = rc
+
+    return panel, ahp_eigen(group_comparison_matrix(matrices))
+
+def use_panel_matrix(matrix):
+    """Replaces the comparison matrix with the aggregated matrix of the panel."""
+    st.session_state.comparison_matrix = matrix
+    st.session_state.pop('comparison_ranges', None)
+    st.session_state.pop('comparison_ranges_editor', None)
+    n = len(matrix)
+    # Drop the input states so the widgets are redrawn from the aggregated matrix
+    for i, j in upper_pairs(n):
+        st.session_state.pop(f"matrix_{i}_{j}", None)
+
+def show_reviewer_panel(metrics):
+    """Collects the comparison matrices of several reviewers and aggregates them."""
+    if 'ahp_panel' not in st.session_state:
+        st.session_state.ahp_panel = {}
+    panel = st.session_state.ahp_panel
+    with st.expander(f"Panel de revisores ({len(panel)})"):
+        st.markdown("""
+        Añada la matriz actual al panel con el nombre de su revisor y repita con las matrices de los
+        demás revisores. Los pesos del panel se calculan sobre la media geométrica de sus matrices.
+        """)
+        cols = st.columns([3, 2])
+        reviewer = cols[0].text_input("Nombre del revisor", value=f"Revisor {len(panel) + 1}", key="ahp_panel_reviewer")
+        if cols[1].button("Añadir matriz actual al panel"):
+            if not reviewer.strip():
+                st.error("Indique el nombre del revisor.")
+            else:
+                panel[reviewer.strip()] = st.session_state.comparison_matrix.copy()
+                st.session_state.pop('ahp_panel_reviewer', None)
+                st.rerun()
+        if not panel:
+            return
+        reviewers = list(panel)
+        matrices = np.stack([panel[r] for r in reviewers])
+        weights, group = calculate_panel_weights(matrices, metrics, reviewers)
+        weights.loc['Panel (agregado)'] = [*group.weights, group.ci, group.cr]
+        table = weights.rename(columns={**METRIC_NAMES, 'ic': 'IC', 'rc': 'RC'})
+        st.dataframe(table.style.format('{:.3f}'), use_container_width=True)
+        if group.cr >= 0.1:
+            st.warning(f"⚠️ La matriz agregada del panel no es consistente (RC: {group.cr:.3f})")
+        cols = st.columns(2)
+        if cols[0].button("Usar matriz agregada del panel"):
+            use_panel_matrix(group_comparison_matrix(matrices))
+            st.rerun()
+        if cols[1].button("Vaciar panel"):
+            st.session_state.ahp_panel = {}
+            st.rerun()
+
+def save_weight_bounds(bounds):
+    """Keeps the weight bounds of the saved AHP weights (or forgets them) for the fleet index ranges."""
+    if bounds is None:
+        st.session_state.pop('ahp_weight_bounds', None)
+    else:
+        st.session_state.ahp_weight_bounds = {
+            'lower': bounds.loc['lower'].to_dict(),
+            'upper': bounds.loc['upper'].to_dict()
+        }
+
+def show_weight_bounds(bounds):
+    """Shows the range of each weight allowed by the comparison ranges."""
+    st.markdown("**Rango de los pesos según las comparaciones por rango**")
+    df = pd.DataFrame({
+        'Métrica': [METRIC_NAMES[m] for m in bounds.columns],
+        'Mínimo': bounds.loc['lower'].to_numpy(),
+        'Peso': bounds.loc['weight'].to_numpy(),
+        'Máximo': bounds.loc['upper'].to_numpy()
+    })
+    st.dataframe(df.style.format({'Mínimo': '{:.3f}', 'Peso': '{:.3f}', 'Máximo': '{:.3f}'}), use_container_width=True)
 
 def show_ahp_results(weights, rc):
     """Shows the results of the weight calculation by Pairwise Comparison Matrix."""
     st.success("Pesos calculados mediante la Matriz de Comparación por Pares:")
-    # Convert weights to a clean format
-    clean_weights = {}
-    for k, v in weights.items():
-        if isinstance(v, dict):
-            val = list(v.values())[0]
-        elif isinstance(v, pd.Series):
-            val = v.iloc[0]
-        else:
-            val = v
-        clean_weights[k] = float(val)
-    # Create DataFrame with weights
-    metrics_list = list(clean_weights.keys())
-    weights_list = [clean_weights[k] for k in metrics_list]
-    names_list = [METRIC_NAMES[k] for k in metrics_list]
-    df_weights = pd.DataFrame({
-        'Métrica': names_list,
-        'Peso': weights_list
-    })
-    # Add relative importance column with balanced criteria
-    df_weights['Importancia'] = df_weights['Peso'].apply(
-        lambda x: '🔴 Alta' if x >= 0.20 else '🟡 Media' if 0.10 < x < 0.20 else '🟢 Baja'
-    )
-    st.dataframe(df_weights.style.format({'Peso': '{:.3f}'}), use_container_width=True)
+    st.dataframe(weights_frame(weights).style.format({'Peso': '{:.3f}'}), use_container_width=True)
     # Show consistency ratio and warnings
     if rc < 0.1:
         st.success(f"✅ Razón de Consistencia: {rc:.3f} (La matriz es consistente)")
     else:
         st.warning(f"⚠️ Razón de Consistencia: {rc:.3f} (La matriz NO es consistente)")
-        st.info("""
-        **Sugerencias para mejorar la consistencia:**
-        1. Revise las comparaciones más extremas
-        2. Asegúrese de que sus comparaciones sean transitivas
-        3. Si A > B y B > C, entonces A debería ser más importante que C
-        """)
+        suggestions = repair_consistency_cached(st.session_state.comparison_matrix) if 'comparison_matrix' in st.session_state else []
+        if suggestions:
+            show_repair_suggestions(suggestions, list(weights.keys()))
+        else:
+            st.info("""
+            **Sugerencias para mejorar la consistencia:**
+            1. Revise las comparaciones más extremas
+            2. Asegúrese de que sus comparaciones sean transitivas
+            3. Si A > B y B > C, entonces A debería ser más importante que C
+            """)
+
+def apply_repair(edits, metrics):
+    """Applies a set of suggested edits to the comparison matrix and recalculates the weights."""
+    state = get_ahp_state()
+    for i, j, _, value in edits:
+        state.set(i, j, value)
+        # Drop the input state so the widget is redrawn from the updated matrix
+        st.session_state.pop(f"matrix_{i}_{j}", None)
+    publish_ahp_results(state, metrics)
+
+def show_repair_suggestions(suggestions, metrics):
+    """Shows the smallest sets of comparison changes that make the matrix consistent."""
+    names = [METRIC_NAMES[m] for m in metrics]
+
+    def format_value(value):
+        return f"{value:.0f}" if value >= 1 else f"1/{1 / value:.0f}"
+
+    st.info("**Cambios sugeridos para que la matriz sea consistente** (ordenados de menor a mayor impacto en los pesos):")
+    for k, suggestion in enumerate(suggestions):
+        changes = "; ".join(
+            f"{names[i]} vs {names[j]}: {old:.2f} → {format_value(new)}"
+            for i, j, old, new in suggestion['edits']
+        )
+        cols = st.columns([4, 1, 1])
+        cols[0].markdown(changes)
+        cols[1].markdown(f"RC: {suggestion['cr']:.3f}")
+        cols[2].button(
+            "Aplicar",
+            key=f"apply_repair_{k}",
+            on_click=apply_repair,
+            args=(suggestion['edits'], metrics)
+        )
 
 def show_ahp_matrix():
     """Shows the interface for the pairwise comparison matrix."""
@@ -95,6 +313,7 @@ def show_ahp_matrix():
     n = len(metrics)
     if 'comparison_matrix' not in st.session_state:
         st.session_state.comparison_matrix = np.ones((n, n))
+    state = get_ahp_state()
     # Column headers
     cols = st.columns(n+1)
     cols[0].write("")
@@ -118,35 +337,24 @@ def show_ahp_matrix():
                     key=f"matrix_{i}_{j}",
                     label_visibility="collapsed"
                 )
-                st.session_state.comparison_matrix[i, j] = value
-                st.session_state.comparison_matrix[j, i] = 1/value
+                # Updates the cell, its reciprocal and the weights (warm-started)
+                state.set(i, j, value)
             else:
                 row[j+1].write(f"{st.session_state.comparison_matrix[i, j]:.2f}")
+    show_comparison_ranges(metrics)
+    show_reviewer_panel(metrics)
+    # Live results: weights and consistency follow every edit of the matrix; an
+    # unedited (or reset) matrix publishes its equal weights too
+    publish_ahp_results(state, metrics, active_comparison_ranges(state.matrix))
     st.markdown("---")
     # Action buttons
-    col_calc, col_save, col_cancel, col_reset = st.columns([1, 1, 1, 1])
-    with col_calc:
-        if st.button("Calcular pesos"):
-            df_criteria = pd.DataFrame(
-                st.session_state.comparison_matrix,
-                index=metrics,
-                columns=metrics
-            )
-            weights = ahp_attributes(df_criteria)
-            ic, rc = consistency_ratio(weights, df_criteria, verbose=False)
-            st.session_state.ahp_results = {
-                'weights': weights,
-                'ic': ic,
-                'rc': rc
-            }
-            st.rerun()
+    col_save, col_cancel, col_reset = st.columns([1, 1, 1])
     with col_save:
         if st.button("Guardar y salir"):
             if 'ahp_results' in st.session_state:
                 weights = st.session_state.ahp_results['weights']
-                if hasattr(weights, 'to_dict'):
-                    weights = weights.to_dict()
                 st.session_state.ahp_weights = weights
+                save_weight_bounds(st.session_state.ahp_results.get('bounds'))
                 # Save results to show in main screen
                 st.session_state.show_ahp_weights_table = {
                     'weights': weights,
@@ -160,8 +368,6 @@ def show_ahp_matrix():
         if st.button("Cancelar"):
             if 'ahp_results' in st.session_state:
                 weights = st.session_state.ahp_results['weights']
-                if hasattr(weights, 'to_dict'):
-                    weights = weights.to_dict()
                 # Save results to show in main screen
                 st.session_state.show_ahp_weights_table = {
                     'weights': weights,
@@ -179,11 +385,22 @@ def show_ahp_matrix():
                 del st.session_state.ahp_weights
             if 'ahp_results' in st.session_state:
                 del st.session_state.ahp_results
+            if 'ahp_state' in st.session_state:
+                del st.session_state.ahp_state
             if 'show_ahp_weights_table' in st.session_state:
                 del st.session_state.show_ahp_weights_table
+            st.session_state.pop('comparison_ranges', None)
+            st.session_state.pop('comparison_ranges_editor', None)
+            save_weight_bounds(None)
+            # Drop the input states so the widgets are redrawn from the reset matrix
+            for i in range(n):
+                for j in range(i + 1, n):
+                    st.session_state.pop(f"matrix_{i}_{j}", None)
             st.warning("¡La matriz de comparación ha sido reiniciada a valores iniciales!")
             st.rerun()
     # Show results if they exist
     if st.session_state.get('ahp_results'):
         show_ahp_results(st.session_state.ahp_results['weights'], st.session_state.ahp_results['rc'])
+        if st.session_state.ahp_results.get('bounds') is not None:
+            show_weight_bounds(st.session_state.ahp_results['bounds'])
     st.stop() 
\ No newline at end of file
@@ -6,11 +6,14 @@ from openpyxl.chart import RadarChart, Reference
 from openpyxl.styles import Font, PatternFill
 from openpyxl.utils import get_column_letter
 import pandas as pd
+import numpy as np
 import io
 import json
 
-from utils.constants import METRIC_NAMES_ES, METRIC_NAMES, EXPORT_COLUMN_MAPPING, RECOMMENDED_WEIGHTS
-from utils.helpers import to_dict_flat
+from metrics import METRIC_CODES
+from services.scoring_service import results_frame
+from utils.constants import METRIC_NAMES_ES, METRIC_NAMES, EXPORT_COLUMN_MAPPING, RECOMMENDED_WEIGHTS, DEVICE_FIELD_TYPES
+from utils.helpers import to_dict_flat, find_config_name
 from weights import validate_manual_weights
 
 class ExcelExporter:
@@ -179,7 +182,7 @@ class ExcelExporter:
             
             # Global calculation inclusion (subtle style)
             inclusion_cell = ws_devices[f'{get_column_letter(inclusion_col)}{i+4}']
-            inclusion_cell.value = "Sí" if st.session_state.selected_devices.get(device['id'], True) else "No"
+            inclusion_cell.value = "Sí" if st.session_state.devices.is_selected(device['id']) else "No"
             inclusion_cell.fill = inclusion_fill
             inclusion_cell.font = Font(bold=False)  # No bold for the value
 
@@ -192,7 +195,7 @@ class ExcelExporter:
         ws_detail['D1'].font = Font(bold=True, size=14)
 
         # Add global calculation inclusion note
-        included = st.session_state.selected_devices.get(device['id'], True)
+        included = st.session_state.devices.is_selected(device['id'])
         ws_detail['A2'] = f"Estado en cálculo global: {'Incluido' if included else 'No incluido'}"
         ws_detail['A2'].font = Font(bold=True, italic=True)
         if not included:
@@ -273,15 +276,15 @@ class ExcelExporter:
             if to_dict_flat(cleaned_weights) == to_dict_flat(recommended):
                 return "Pesos Recomendados"
         
-            for name, config in st.session_state.saved_weights.items():
-                if to_dict_flat(config) == to_dict_flat(cleaned_weights):
-                    return f"Configuración Manual: {name}"
+            name = find_config_name('manual', cleaned_weights)
+            if name is not None:
+                return f"Configuración Manual: {name}"
             return "Pesos Manuales Personalizados"
 
         elif weight_mode == "Calcular nuevos pesos":
-            for config_name, config in st.session_state.ahp_configurations.items():
-                if to_dict_flat(config['weights']) == to_dict_flat(cleaned_weights):
-                    return f"Configuración Calculada: {config_name}"
+            config_name = find_config_name('ahp', cleaned_weights)
+            if config_name is not None:
+                return f"Configuración Calculada: {config_name}"
             return "Pesos Calculados"
     
         return "Pesos Recomendados"
@@ -305,20 +308,66 @@ def export_results_excel():
     exporter = ExcelExporter()
     return exporter.export()
 
+def devices_results_frame(devices):
+    """
+    Builds the typed table of a device list: template input columns plus the raw
+    and normalized metrics and the sustainability index of every device.
+    """
+    if hasattr(devices, 'input_frame'):
+        # DeviceFleet: the metrics are already stored as matrices
+        rows = devices.order()
+        inputs = devices.input_frame()
+        raw = devices.raw_metrics[rows]
+        normalized = devices.normalized_metrics[rows]
+        index = devices.sustainability_index[rows]
+    else:
+        devices = list(devices)
+        inputs = pd.DataFrame({
+            'name': [device.get('name', '') for device in devices],
+            **{
+                field: np.array([device.get(field, 0) for device in devices], dtype=float)
+                for field in DEVICE_FIELD_TYPES
+            }
+        })
+        raw = np.array([[device['result']['raw_metrics'][m] for m in METRIC_CODES] for device in devices], dtype=float).reshape(-1, len(METRIC_CODES))
+        normalized = np.array([[device['result']['normalized_metrics'][m] for m in METRIC_CODES] for device in devices], dtype=float).reshape(-1, len(METRIC_CODES))
+        index = np.array([device['result']['sustainability_index'] for device in devices], dtype=float)
+    columns = {
+        field: inputs[field].to_numpy().astype(np.int64 if cast is int else float)
+        for field, cast in DEVICE_FIELD_TYPES.items()
+    }
+    return results_frame(inputs['name'].to_numpy(), columns, raw, normalized, index)
+
 def export_devices_list(devices, format='excel'):
     """
-    Exports the device list in the specified format (excel, csv, json),
+    Exports the device list in the specified format (excel, csv, json, parquet, arrow),
     using template column names for maximum compatibility.
-    Returns a buffer (Excel), encoded string (CSV) or encoded string (JSON).
+    Returns a buffer (Excel, Parquet, Arrow IPC), encoded string (CSV) or encoded string (JSON).
+    The columnar formats (Parquet, Arrow IPC) keep the column types and also include
+    the raw and normalized metrics of every device.
     """
+    if format in ('parquet', 'arrow'):
+        df = devices_results_frame(devices)
+        buffer = io.BytesIO()
+        if format == 'parquet':
+            df.to_parquet(buffer, index=False)
+        else:
+            df.to_feather(buffer)
+        buffer.seek(0)
+        return buffer
     column_mapping = EXPORT_COLUMN_MAPPING
     internal_columns = list(column_mapping.keys())
     headers = [column_mapping[col] for col in internal_columns]
-    data = []
-    for device in devices:
-        row = [device.get(col, '') for col in internal_columns]
-        data.append(row)
-    df = pd.DataFrame(data, columns=headers)
+    if hasattr(devices, 'input_frame'):
+        # DeviceFleet: build the table straight from its typed columns
+        df = devices.input_frame()[internal_columns]
+        df.columns = headers
+    else:
+        data = []
+        for device in devices:
+            row = [device.get(col, '') for col in internal_columns]
+            data.append(row)
+        df = pd.DataFrame(data, columns=headers)
     if format == 'excel':
         buffer = io.BytesIO()
         with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
@@ -329,10 +378,7 @@ def export_devices_list(devices, format='excel'):
         csv = df.to_csv(index=False, sep=',', encoding='utf-8')
         return csv.encode('utf-8')
     elif format == 'json':
-        data_json = [
-            {column_mapping[col]: device.get(col, '') for col in internal_columns}
-            for device in devices
-        ]
+        data_json = df.to_dict(orient='records')
         json_str = json.dumps(data_json, indent=2, ensure_ascii=False)
         return json_str.encode('utf-8')
     else:
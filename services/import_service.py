@@ -1,6 +1,13 @@
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
+import numpy as np
+import openpyxl
 import io
-from utils.constants import IMPORT_COLUMN_DESCRIPTIONS, IMPORT_WARNING
+from typing import NamedTuple
+from metrics import METRIC_CODES
+from utils.constants import IMPORT_COLUMN_DESCRIPTIONS, IMPORT_WARNING, DEVICE_FIELD_TYPES, DEVICE_FIELD_RANGES
 import json
 
 # Template for importing devices from CSV, Excel or JSON files
@@ -25,29 +32,351 @@ TEMPLATE_COLUMNS_MAPPING = {
     "peso_final_g": "W"
 }
 
-def read_devices_file(file):
+# Internal names -> template names, used to report errors with the names of the file
+TEMPLATE_COLUMNS = {internal: template for template, internal in TEMPLATE_COLUMNS_MAPPING.items()}
+
+# Result columns written by the columnar exports; they are recalculated on import
+RESULT_COLUMNS = (
+    [f"{m}_bruto" for m in METRIC_CODES]
+    + [f"{m}_normalizado" for m in METRIC_CODES]
+    + ["indice_sostenibilidad"]
+)
+
+# Column set by line-oriented readers on rows they could not parse, with the reason
+READ_ERROR_COLUMN = "_error_lectura"
+
+# Rows per chunk when streaming large files
+DEFAULT_CHUNK_ROWS = 50_000
+
+def map_template_columns(df):
+    """Renames template columns to standard internal names."""
+    mapped_columns = {col: TEMPLATE_COLUMNS_MAPPING[col] for col in df.columns if col in TEMPLATE_COLUMNS_MAPPING}
+    return df.rename(columns=mapped_columns)
+
+class DeviceImport(NamedTuple):
+    """Result of reading and validating a devices file.
+
+    Attributes:
+        devices (DataFrame): Every row of the file, with internal column names and typed
+            input fields (float, or nullable Int64 for integer fields); invalid cells are NA
+        valid (ndarray): Boolean mask of the rows that passed every check
+        errors (DataFrame): One row per problem found: 'fila' (1-based data row),
+            'nombre', 'columna' (template name), 'valor' (as read) and 'error'
+    """
+    devices: pd.DataFrame
+    valid: np.ndarray
+    errors: pd.DataFrame
+
+    @property
+    def valid_devices(self):
+        return self.devices[self.valid]
+
+def _range_message(minimum, maximum, exclusive):
+    if maximum is not None:
+        return f"Debe estar entre {minimum} y {maximum}"
+    return f"Debe ser mayor que {minimum}" if exclusive else f"Debe ser mayor o igual que {minimum}"
+
+def validate_devices(df):
+    """
+    Coerces and validates the input fields of a devices DataFrame (internal names)
+    in one vectorized pass per column, using the ranges of DEVICE_FIELD_RANGES.
+    Comma decimals are accepted. Returns a DeviceImport.
+    """
+    n = len(df)
+    devices = df.drop(columns=READ_ERROR_COLUMN, errors='ignore')
+    valid = np.ones(n, dtype=bool)
+    names = df['name'].fillna('').astype(str).to_numpy() if 'name' in df.columns else np.full(n, '')
+    problems = []  # (row positions, template column, values as read, messages)
+
+    # Rows the reader could not parse (e.g. malformed JSON lines) are reported once, with its message
+    unreadable = np.zeros(n, dtype=bool)
+    if READ_ERROR_COLUMN in df.columns:
+        unreadable = df[READ_ERROR_COLUMN].notna().to_numpy()
+        rows = np.flatnonzero(unreadable)
+        if len(rows):
+            valid[rows] = False
+            problems.append((rows, '', np.full(len(rows), ''), df[READ_ERROR_COLUMN].to_numpy()[rows].astype(str)))
+
+    def report(mask, field, raw, message):
+        rows = np.flatnonzero(mask & ~unreadable)
+        if len(rows):
+            valid[rows] = False
+            # Only the offending cells are turned into text
+            problems.append((
+                rows,
+                TEMPLATE_COLUMNS[field],
+                raw.iloc[rows].fillna('').astype(str).to_numpy(),
+                np.full(len(rows), message)
+            ))
+
+    numbers = {}
+    for field, cast in DEVICE_FIELD_TYPES.items():
+        raw = df[field] if field in df.columns else pd.Series(np.nan, index=df.index)
+        missing = raw.isna().to_numpy().copy()
+        values = raw
+        if not pd.api.types.is_numeric_dtype(raw):
+            values = raw.astype(str).str.strip().str.replace(',', '.', regex=False)
+            missing |= (values == '').to_numpy()
+        values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+
+        report(missing, field, raw, "Valor faltante")
+        report(~missing & ~np.isfinite(values), field, raw, "Valor no numérico")
+        finite = np.isfinite(values)
+        minimum, maximum, exclusive = DEVICE_FIELD_RANGES[field]
+        with np.errstate(invalid='ignore'):
+            out = (values <= minimum) if exclusive else (values < minimum)
+            if maximum is not None:
+                out |= values > maximum
+            report(finite & out, field, raw, _range_message(minimum, maximum, exclusive))
+            fractional = np.zeros(n, dtype=bool)
+            if cast is int:
+                fractional = finite & ~out & (values != np.trunc(values))
+                report(fractional, field, raw, "Debe ser un número entero")
+        # Cells of this field that passed every check
+        numbers[field] = (values, raw, finite & ~out & ~fractional)
+
+    # Cross-field rule: the device cannot weigh more after use than when new; only
+    # checked where both weights are valid, so a bad W0 is not reported twice
+    final, final_raw, final_ok = numbers['W']
+    initial, _, initial_ok = numbers['W0']
+    report(final_ok & initial_ok & (final > initial), 'W', final_raw, f"No puede ser mayor que {TEMPLATE_COLUMNS['W0']}")
+
+    for field, cast in DEVICE_FIELD_TYPES.items():
+        values = np.where(valid, numbers[field][0], np.nan)
+        devices[field] = pd.Series(values, index=df.index).astype('Int64' if cast is int else float)
+
+    if problems:
+        rows = np.concatenate([p[0] for p in problems])
+        order = np.argsort(rows, kind='stable')
+        errors = pd.DataFrame({
+            'fila': rows + 1,
+            'nombre': names[rows],
+            'columna': np.concatenate([np.full(len(p[0]), p[1]) for p in problems]),
+            'valor': np.concatenate([p[2] for p in problems]),
+            'error': np.concatenate([p[3] for p in problems])
+        }).iloc[order].reset_index(drop=True)
+    else:
+        errors = pd.DataFrame(columns=['fila', 'nombre', 'columna', 'valor', 'error'])
+    return DeviceImport(devices, valid, errors)
+
+# Newline-delimited JSON: one device object per line
+JSON_LINES_EXTENSIONS = ('.jsonl', '.ndjson')
+
+# Columnar formats: typed columns are read as is, without parsing text
+PARQUET_EXTENSIONS = ('.parquet',)
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+
+# Every extension read_devices_file accepts
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.json') + JSON_LINES_EXTENSIONS + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+def read_devices_file(file, chunk_rows=DEFAULT_CHUNK_ROWS):
     """
-    Reads a devices file in CSV, Excel or JSON format and returns a DataFrame.
-    Renames template columns to standard internal names.
+    Reads a devices file in CSV, Excel, JSON, JSON Lines, Parquet or Arrow IPC format, renames template columns to
+    standard internal names and validates every row. Returns a DeviceImport.
+    The file is read and validated chunk by chunk (see iter_devices_file), so only
+    the typed columns of the whole file are kept in memory.
+    """
+    parts = [
+        validate_devices(chunk.drop(columns=RESULT_COLUMNS, errors='ignore'))
+        for chunk in iter_devices_file(file, chunk_rows)
+    ]
+    return concat_imports(parts)
+
+# Column added to the devices of a bulk import with the file each one came from
+SOURCE_COLUMN = "source_file"
+
+def expand_archives(files):
+    """
+    Yields the given files, replacing each ZIP archive by its supported members
+    as in-memory files named after their path inside the archive.
+    """
+    for file in files:
+        if not file.name.lower().endswith('.zip'):
+            yield file
+            continue
+        with zipfile.ZipFile(file) as archive:
+            for info in archive.infolist():
+                base = os.path.basename(info.filename)
+                # Skip folders and the metadata files some archivers add
+                if info.is_dir() or base.startswith('.') or info.filename.startswith('__MACOSX/'):
+                    continue
+                if not base.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                member = io.BytesIO(archive.read(info))
+                member.name = info.filename
+                yield member
+
+def read_devices_files(files, workers=None, on_progress=None):
+    """
+    Reads several devices files (ZIP archives are expanded) concurrently and merges
+    them into one DeviceImport.
+
+    Files are parsed in a thread pool: the uploads are already in memory and the
+    parsers (pandas, pyarrow) spend most of their time outside the GIL. The merged
+    devices keep the order of the files and get a SOURCE_COLUMN with the file name;
+    the error table gets an 'archivo' column and keeps the row numbers of each file.
+    A file that cannot be read is reported as an error with 'fila' 0 and does not
+    stop the others.
+
+    Args:
+        files: File-like objects with a `name` (e.g. Streamlit uploads)
+        workers (int): Number of threads; by default one per file, up to the CPU count
+        on_progress: Optional callback(done, total, file name, error message or None),
+            called from the calling thread as each file finishes
+
+    Returns:
+        DeviceImport
+    """
+    files = list(expand_archives(files))
+    parts = [None] * len(files)
+    failures = {}
+    workers = workers or max(1, min(len(files), os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(read_devices_file, file): i for i, file in enumerate(files)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                parts[i] = future.result()
+            except Exception as e:
+                failures[i] = str(e)
+            if on_progress is not None:
+                on_progress(done, len(files), files[i].name, failures.get(i))
+
+    devices, valid, errors = [], [], []
+    for i, file in enumerate(files):
+        if i in failures:
+            errors.append(pd.DataFrame([{
+                'fila': 0, 'nombre': '', 'columna': '', 'valor': '',
+                'error': f"No se pudo leer el archivo: {failures[i]}"
+            }]).assign(archivo=file.name))
+            continue
+        part = parts[i]
+        devices.append(part.devices.assign(**{SOURCE_COLUMN: file.name}))
+        valid.append(part.valid)
+        if len(part.errors):
+            errors.append(part.errors.assign(archivo=file.name))
+    empty = validate_devices(pd.DataFrame())
+    error_columns = ['archivo'] + list(empty.errors.columns)
+    return DeviceImport(
+        pd.concat(devices, ignore_index=True) if devices else empty.devices.assign(**{SOURCE_COLUMN: ''}),
+        np.concatenate(valid) if valid else empty.valid,
+        pd.concat(errors, ignore_index=True)[error_columns] if errors else pd.DataFrame(columns=error_columns)
+    )
+
+def concat_imports(parts):
+    """Joins the DeviceImports of consecutive chunks, renumbering the error rows."""
+    if not parts:
+        return validate_devices(pd.DataFrame())
+    if len(parts) == 1:
+        return parts[0]
+    offsets = np.cumsum([0] + [len(part.devices) for part in parts[:-1]])
+    errors = [part.errors.assign(fila=part.errors['fila'] + offset) for part, offset in zip(parts, offsets) if len(part.errors)]
+    return DeviceImport(
+        pd.concat([part.devices for part in parts], ignore_index=True),
+        np.concatenate([part.valid for part in parts]),
+        pd.concat(errors, ignore_index=True) if errors else parts[0].errors
+    )
+
+def iter_devices_file(file, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Reads a devices file in chunks of at most `chunk_rows` rows and yields one
+    DataFrame per chunk, with template columns renamed to internal names.
+    CSV, Excel, JSON Lines, Parquet and Arrow IPC files are streamed, so memory stays bounded
+    regardless of file size; JSON files are loaded once and then split.
     """
     name = file.name.lower()
     if name.endswith('.csv'):
-        df = pd.read_csv(file)
+        with pd.read_csv(file, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                yield map_template_columns(chunk)
     elif name.endswith('.xlsx'):
-        df = pd.read_excel(file)
+        yield from iter_excel_chunks(file, chunk_rows)
+    elif name.endswith(JSON_LINES_EXTENSIONS):
+        yield from iter_json_lines_chunks(file, chunk_rows)
+    elif name.endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS):
+        for batch in _iter_record_batches(file, name, chunk_rows):
+            yield map_template_columns(batch.to_pandas())
     elif name.endswith('.json'):
-        df = pd.read_json(file)
+        df = map_template_columns(pd.read_json(file))
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
     else:
-        raise ValueError("Formato de archivo no soportado. Usa CSV, Excel o JSON.")
-    # Rename columns using fixed mapping
-    mapped_columns = {col: TEMPLATE_COLUMNS_MAPPING[col] for col in df.columns if col in TEMPLATE_COLUMNS_MAPPING}
-    df = df.rename(columns=mapped_columns)
-    return df
+        raise ValueError("Formato de archivo no soportado. Usa CSV, Excel, JSON, JSON Lines, Parquet o Arrow.")
+
+def iter_excel_chunks(file, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Streams the first sheet of an .xlsx workbook in openpyxl read-only mode and yields
+    DataFrames of at most `chunk_rows` rows with internal column names.
+
+    Rows are parsed lazily from the sheet XML, so memory is bounded by the chunk size
+    and the first chunk is available before the rest of the workbook is read. Cell
+    values keep the types stored in the workbook (numbers are not parsed from text).
+    """
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        # Trailing unnamed columns (e.g. formatted but empty cells) are ignored
+        width = max((i + 1 for i, column in enumerate(header) if column is not None), default=0)
+        columns = [TEMPLATE_COLUMNS_MAPPING.get(column, column) for column in header[:width]]
+        chunk = []
+        for row in rows:
+            row = row[:width]
+            if all(value is None for value in row):
+                continue
+            chunk.append(row)
+            if len(chunk) == chunk_rows:
+                yield pd.DataFrame.from_records(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame.from_records(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+def iter_json_lines_chunks(file, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Parses a newline-delimited JSON file (.jsonl, .ndjson) line by line and yields
+    DataFrames of at most `chunk_rows` devices with internal column names.
+
+    Blank lines are skipped. A line that is not a valid JSON object does not stop the
+    import: it becomes an empty row whose READ_ERROR_COLUMN holds the line number and
+    the reason, so validate_devices reports it along with the other errors.
+    """
+    records = []
+    for number, line in enumerate(file, start=1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            line = line.strip().lstrip('\ufeff')
+            if not line:
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("no es un objeto JSON")
+        except ValueError as e:
+            # json.JSONDecodeError and UnicodeDecodeError are ValueErrors too
+            record = {READ_ERROR_COLUMN: f"Línea {number} mal formada: {e}"}
+        records.append(record)
+        if len(records) == chunk_rows:
+            yield map_template_columns(pd.DataFrame.from_records(records))
+            records = []
+    if records:
+        yield map_template_columns(pd.DataFrame.from_records(records))
 
-def to_float(val):
-    if isinstance(val, str):
-        val = val.replace(',', '.')
-    return float(val)
+def _iter_record_batches(file, name, chunk_rows):
+    """Yields the record batches of a Parquet or Arrow IPC file, at most `chunk_rows` rows each."""
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as ipc
+    if name.endswith(PARQUET_EXTENSIONS):
+        yield from pq.ParquetFile(file).iter_batches(batch_size=chunk_rows)
+        return
+    reader = ipc.open_file(file)
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield batch.slice(start, chunk_rows)
 
 def generate_excel_template():
     """
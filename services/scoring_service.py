@@ -0,0 +1,140 @@
+import os
+from itertools import chain
+from contextlib import nullcontext, ExitStack
+import numpy as np
+import pandas as pd
+from model import FleetSustainability
+from parallel import bounded_map, parallel_min_rows, spawn_executor
+from metrics import METRIC_CODES
+from fleet import FleetAggregate, weights_vector
+from utils.constants import DEVICE_FIELD_TYPES, EXPORT_COLUMN_MAPPING
+from services.import_service import READ_ERROR_COLUMN, TEMPLATE_COLUMNS, validate_devices
+
+# Batch scoring pipelines used outside the Streamlit session (CLI, nightly jobs)
+
+# Rows per task: chunks are split into tasks of this size whether or not a pool is
+# used, so the partial sums (and the global result) do not depend on the workers
+TASK_ROWS = 10_000
+
+def results_frame(names, columns, raw, normalized, index):
+    """Builds the per-device results table with template column names."""
+    data = {EXPORT_COLUMN_MAPPING['name']: names}
+    for field in DEVICE_FIELD_TYPES:
+        data[EXPORT_COLUMN_MAPPING[field]] = columns[field]
+    for j, metric in enumerate(METRIC_CODES):
+        data[f"{metric}_bruto"] = raw[:, j]
+    for j, metric in enumerate(METRIC_CODES):
+        data[f"{metric}_normalizado"] = normalized[:, j]
+    data["indice_sostenibilidad"] = index
+    return pd.DataFrame(data)
+
+def _check_columns(df):
+    """Rejects a chunk that lacks some template column."""
+    missing = [TEMPLATE_COLUMNS[field] for field in DEVICE_FIELD_TYPES if field not in df.columns]
+    # A chunk made only of unreadable lines (JSON Lines) has no columns to check
+    readable = READ_ERROR_COLUMN not in df.columns or df[READ_ERROR_COLUMN].isna().any()
+    if missing and readable:
+        raise ValueError(f"Faltan columnas obligatorias en el archivo: {', '.join(missing)}")
+
+def _score_chunk(task):
+    """Worker entry point: validates, scores and renders one chunk as CSV text.
+
+    Formatting the output is the most expensive step on large files, so it is
+    done in the workers too. Only the text, the rejected rows and the partial
+    sums travel back.
+    """
+    df, offset, weights, header = task
+    checked = validate_devices(df)
+    errors = checked.errors.assign(fila=checked.errors['fila'] + offset)
+    devices = checked.valid_devices
+    names = devices['name'].to_numpy() if 'name' in devices.columns else np.full(len(devices), '')
+    columns = {field: devices[field].to_numpy(dtype=float) for field in DEVICE_FIELD_TYPES}
+    result = FleetSustainability(weights).calculate_sustainability(columns)
+    raw = np.column_stack([result['raw_metrics'][m] for m in METRIC_CODES]).reshape(-1, len(METRIC_CODES))
+    normalized = np.column_stack([result['normalized_metrics'][m] for m in METRIC_CODES]).reshape(-1, len(METRIC_CODES))
+    index = result['sustainability_index']
+    text = None
+    if header is not None:
+        text = results_frame(names, columns, raw, normalized, index).to_csv(index=False, header=header)
+    return text, errors, int((~checked.valid).sum()), len(index), index.sum(), normalized.sum(axis=0)
+
+def _tasks(frames, weights, write):
+    """Splits each chunk into tasks of TASK_ROWS rows, with row offsets counted from the start of the file."""
+    offset = 0
+    header = True
+    for df in frames:
+        _check_columns(df)
+        for start in range(0, len(df), TASK_ROWS):
+            yield df.iloc[start:start + TASK_ROWS], offset + start, weights, (header if write else None)
+            header = False
+        offset += len(df)
+
+def score_stream(frames, weights, output=None, workers=1, errors_output=None, min_rows=None):
+    """Scores a stream of device chunks, folding each one into running global aggregates.
+
+    Only the chunks in flight are held in memory, so peak memory is bounded by
+    the chunk size regardless of the file size. Chunks are split into tasks of
+    TASK_ROWS rows; when the first chunk has at least `min_rows` devices, the
+    tasks are spread across `workers` processes, which validate, score and
+    format them. Smaller inputs are processed in-process, with the same result.
+    Every chunk goes through validate_devices, like the dashboard import: only
+    valid rows are scored, and a file without some template column is rejected.
+
+    Args:
+        frames: Iterable of DataFrames with internal column names (e.g. iter_devices_file)
+        weights (dict): Weights configuration (plain or AHP format)
+        output: Optional path or text file object for the per-device results (CSV)
+        workers (int): Number of processes; None uses one per CPU, 1 runs in-process
+        errors_output: Optional path or text file object for the rejected rows and
+            their reasons (CSV with the columns of the import error table)
+        min_rows (int): Chunk size from which processes are used (parallel_min_rows
+            by default)
+
+    Returns:
+        dict: Global result over the valid devices, as FleetAggregate.result() (with
+        None averages if there are none), plus 'rejected_count'
+
+    Raises:
+        ValueError: If a required template column is missing
+    """
+    weights = dict(zip(METRIC_CODES, weights_vector(weights)))
+    workers = workers or os.cpu_count() or 1
+    if min_rows is None:
+        min_rows = parallel_min_rows(workers)
+    # The first chunk decides whether the pool is worth starting
+    frames = iter(frames)
+    first = next(frames, None)
+    pooled = workers > 1 and first is not None and len(first) >= min_rows
+    frames = chain([] if first is None else [first], frames)
+    tasks = _tasks(frames, weights, output is not None)
+
+    aggregate = FleetAggregate()
+    rejected_count = 0
+    errors_header = True
+    if output is None:
+        f = nullcontext()
+    elif isinstance(output, str):
+        f = open(output, 'w', encoding='utf-8', newline='')
+    else:
+        f = nullcontext(output)
+    errors_file = open(errors_output, 'w', encoding='utf-8', newline='') if isinstance(errors_output, str) else nullcontext(errors_output)
+
+    with f as out, errors_file as errors_out, ExitStack() as stack:
+        if pooled:
+            executor = stack.enter_context(spawn_executor(workers))
+            results = bounded_map(executor, _score_chunk, tasks, 2 * workers)
+        else:
+            results = map(_score_chunk, tasks)
+        # Results arrive in task order, so rows are written in file order
+        for text, errors, rejected, count, index_sum, metrics_sum in results:
+            if out is not None:
+                out.write(text)
+            if rejected:
+                rejected_count += rejected
+                if errors_out is not None:
+                    errors.to_csv(errors_out, index=False, header=errors_header)
+                    errors_header = False
+            aggregate.add(index_sum, metrics_sum, count)
+    summary = aggregate.result() or {"total_average": None, "metrics_average": None, "device_count": 0}
+    summary["rejected_count"] = rejected_count
+    return summary
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from fleet import DeviceFleet, weights_vector
+from metrics import METRIC_CODES
+from test_model import device_result, random_columns
+from utils.constants import DEVICE_FIELD_TYPES, RECOMMENDED_WEIGHTS
+
+def devices(n_rows, seed=0):
+    weights = {metric: float(weight) for metric, weight in zip(METRIC_CODES, weights_vector(RECOMMENDED_WEIGHTS))}
+    for row, device in enumerate(random_columns(n_rows, seed).to_dict('records')):
+        device = {field: DEVICE_FIELD_TYPES[field](value) for field, value in device.items()}
+        yield {'id': f"d{seed}-{row}", 'name': f"d{row}", **device, 'result': device_result(device, weights)}
+
+def recomputed_result(fleet):
+    """Global result averaged from scratch over the selected devices."""
+    selected = [device for device in fleet if fleet.is_selected(device['id'])]
+    if not selected:
+        return None
+    return {
+        'total_average': np.mean([device['result']['sustainability_index'] for device in selected]),
+        'metrics_average': {
+            metric: np.mean([device['result']['normalized_metrics'][metric] for device in selected])
+            for metric in METRIC_CODES
+        },
+        'device_count': len(selected)
+    }
+
+def assert_aggregates(fleet):
+    result, expected = fleet.global_result(), recomputed_result(fleet)
+    if expected is None:
+        assert result is None
+        return
+    assert result['device_count'] == expected['device_count']
+    assert result['total_average'] == pytest.approx(expected['total_average'], rel=1e-12)
+    assert result['metrics_average'] == pytest.approx(expected['metrics_average'], rel=1e-12)
+
+def test_running_aggregates_match_recomputed_averages():
+    fleet = DeviceFleet(capacity=2)
+    fleet.extend(devices(8))
+    assert_aggregates(fleet)
+    fleet.remove('d0-0')
+    fleet.remove('d0-7')
+    assert_aggregates(fleet)
+    fleet.set_selected('d0-3', False)
+    fleet.set_selected('d0-3', False)
+    assert_aggregates(fleet)
+    fleet.update('d0-4', next(devices(1, seed=1)))
+    assert_aggregates(fleet)
+    fleet.append(next(devices(1, seed=2)))
+    assert_aggregates(fleet)
+    fleet.select_all(False)
+    assert_aggregates(fleet)
+    fleet.set_selected('d0-5', True)
+    assert_aggregates(fleet)
+    fleet.select_all()
+    assert_aggregates(fleet)
+
+def test_apply_weights_matches_per_device_scores():
+    fleet = DeviceFleet()
+    fleet.extend(devices(20))
+    fleet.set_selected('d0-2', False)
+    weights = {'EC': 0.05, 'CF': 0.05, 'EW': 0.1, 'RE': 0.2, 'EE': 0.2, 'PD': 0.2, 'RC': 0.1, 'MT': 0.1}
+    fleet.apply_weights(weights)
+    for device in fleet:
+        assert device['used_weights'] == weights
+        expected = device_result({field: device[field] for field in DEVICE_FIELD_TYPES}, weights)
+        assert device['result']['sustainability_index'] == pytest.approx(expected['sustainability_index'], rel=1e-12)
+    assert_aggregates(fleet)
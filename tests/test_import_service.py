@@ -0,0 +1,62 @@
+import io
+import zipfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+from services.import_service import SOURCE_COLUMN, read_devices_file, read_devices_files
+from test_scoring_service import DEVICE
+
+TEMPLATE = pd.DataFrame([
+    DEVICE,
+    {**DEVICE, 'nombre': 'Cámara', 'potencia_w': 7.5, 'mantenimientos': 3, 'peso_final_g': 150.5},
+    {**DEVICE, 'nombre': 'Roto', 'horas_uso_diario': 30}
+])
+
+def named(data, name):
+    file = io.BytesIO(data)
+    file.name = name
+    return file
+
+def write(df, extension):
+    """Writes the template frame in one of the supported import formats."""
+    buffer = io.BytesIO()
+    if extension == '.csv':
+        df.to_csv(buffer, index=False)
+    elif extension == '.xlsx':
+        df.to_excel(buffer, index=False)
+    elif extension == '.json':
+        df.to_json(buffer, orient='records', force_ascii=False)
+    elif extension == '.jsonl':
+        df.to_json(buffer, orient='records', lines=True, force_ascii=False)
+    elif extension == '.parquet':
+        df.to_parquet(buffer, index=False)
+    elif extension == '.arrow':
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    return named(buffer.getvalue(), f"dispositivos{extension}")
+
+@pytest.mark.parametrize('extension', ['.xlsx', '.json', '.jsonl', '.parquet', '.arrow'])
+def test_every_format_imports_the_same_devices(extension):
+    expected = read_devices_file(write(TEMPLATE, '.csv'))
+    imported = read_devices_file(write(TEMPLATE, extension))
+    pd.testing.assert_frame_equal(imported.devices, expected.devices, check_dtype=False)
+    assert imported.valid.tolist() == expected.valid.tolist() == [True, True, False]
+    pd.testing.assert_frame_equal(imported.errors, expected.errors, check_dtype=False)
+
+def test_zip_members_import_like_the_files():
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('lote/a.csv', write(TEMPLATE, '.csv').getvalue())
+        zf.writestr('lote/b.parquet', write(TEMPLATE, '.parquet').getvalue())
+        zf.writestr('__MACOSX/lote/._a.csv', b'')
+        zf.writestr('lote/notas.txt', b'no es un dispositivo')
+    imported = read_devices_files([named(archive.getvalue(), 'lote.zip')], workers=1)
+    expected = read_devices_file(write(TEMPLATE, '.csv')).devices
+    assert imported.devices[SOURCE_COLUMN].tolist() == ['lote/a.csv'] * 3 + ['lote/b.parquet'] * 3
+    pd.testing.assert_frame_equal(
+        imported.devices.drop(columns=SOURCE_COLUMN),
+        pd.concat([expected, expected], ignore_index=True),
+        check_dtype=False
+    )
+    assert imported.valid.tolist() == [True, True, False] * 2
+    assert imported.errors['archivo'].tolist() == ['lote/a.csv', 'lote/b.parquet']
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from model import FleetSustainability, IoTSustainability
+from metrics import METRIC_CODES
+
+def random_columns(n_rows, seed=0):
+    """Random device inputs, spread past the normalization references so clipping is covered."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'power': rng.uniform(0.1, 300, n_rows), 'hours': rng.uniform(0, 24, n_rows),
+        'days': rng.uniform(0, 365, n_rows), 'weight': rng.uniform(0.01, 20, n_rows),
+        'life': rng.uniform(0.5, 15, n_rows), 'renewable_energy': rng.uniform(0, 100, n_rows),
+        'functionality': rng.uniform(1, 10, n_rows), 'recyclability': rng.uniform(0, 100, n_rows),
+        'B': rng.integers(0, 5, n_rows), 'Wb': rng.uniform(0, 200, n_rows), 'M': rng.integers(0, 5, n_rows),
+        'C': rng.integers(0, 5, n_rows), 'Wc': rng.uniform(0, 50, n_rows), 'W0': rng.uniform(100, 500, n_rows),
+        'W': rng.uniform(50, 100, n_rows)
+    })
+
+def device_result(device, weights):
+    """Scores one device with the per-device model, as the add-device form does."""
+    sensor = IoTSustainability('d')
+    sensor.weights = weights
+    sensor.calculate_energy_consumption(device['power'], device['hours'], device['days'])
+    sensor.calculate_carbon_footprint()
+    sensor.calculate_ewaste(device['weight'], device['life'])
+    sensor.calculate_renewable_energy(device['renewable_energy'])
+    sensor.calculate_energy_efficiency(device['functionality'])
+    sensor.calculate_durability(device['life'])
+    sensor.calculate_recyclability(device['recyclability'])
+    sensor.calculate_maintenance_index(device['B'], device['Wb'], device['M'], device['C'],
+                                       device['Wc'], device['W0'], device['W'])
+    return sensor.calculate_sustainability()
+
+def test_fleet_scores_match_per_device_model():
+    columns = random_columns(200)
+    weights = {'EC': 0.3, 'CF': 0.1, 'EW': 0.1, 'RE': 0.1, 'EE': 0.1, 'PD': 0.1, 'RC': 0.1, 'MT': 0.1}
+    fleet = FleetSustainability(weights).calculate_sustainability(columns)
+    for row, device in enumerate(columns.to_dict('records')):
+        expected = device_result(device, weights)
+        for metric in METRIC_CODES:
+            assert fleet['raw_metrics'][metric][row] == expected['raw_metrics'][metric]
+            assert fleet['normalized_metrics'][metric][row] == expected['normalized_metrics'][metric]
+        assert fleet['sustainability_index'][row] == expected['sustainability_index']
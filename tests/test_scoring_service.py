@@ -0,0 +1,70 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+import services.scoring_service as scoring_service
+from parallel import parallel_min_rows
+from services.import_service import DEFAULT_CHUNK_ROWS, iter_devices_file
+from services.scoring_service import score_stream
+from utils.constants import RECOMMENDED_WEIGHTS
+
+DEVICE = {
+    'nombre': 'Sensor', 'potencia_w': 2, 'horas_uso_diario': 24, 'dias_uso_anio': 365,
+    'peso_kg': 0.1, 'vida_util_anios': 5, 'energia_renovable_pct': 30, 'funcionalidad_1_10': 8,
+    'reciclabilidad_pct': 65, 'baterias_vida_util': 2, 'peso_bateria_g': 50, 'mantenimientos': 1,
+    'componentes_reemplazados': 2, 'peso_componente_g': 20, 'peso_nuevo_g': 200, 'peso_final_g': 180
+}
+
+def json_lines_file(lines, name='dispositivos.jsonl'):
+    file = io.BytesIO('\n'.join(lines).encode('utf-8'))
+    file.name = name
+    return file
+
+def test_malformed_json_lines_are_rejected_not_scored():
+    lines = [json.dumps(DEVICE), '{"nombre": "roto",', json.dumps(DEVICE), '[1, 2]', json.dumps(DEVICE)]
+    errors = io.StringIO()
+    summary = score_stream(iter_devices_file(json_lines_file(lines), chunk_rows=2), RECOMMENDED_WEIGHTS, errors_output=errors)
+    assert summary['device_count'] == 3
+    assert summary['rejected_count'] == 2
+    report = errors.getvalue().splitlines()
+    assert report[0] == 'fila,nombre,columna,valor,error'
+    assert [row.split(',')[0] for row in report[1:]] == ['2', '4']
+    assert 'Línea 2 mal formada' in report[1]
+
+def test_chunk_of_only_malformed_lines_is_not_a_missing_column():
+    lines = ['no es json', '{"nombre": ', json.dumps(DEVICE)]
+    summary = score_stream(iter_devices_file(json_lines_file(lines), chunk_rows=2), RECOMMENDED_WEIGHTS)
+    assert summary['device_count'] == 1
+    assert summary['rejected_count'] == 2
+
+def csv_file(n_rows, seed=0):
+    """Random devices in template format, about one in ten with an invalid value."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame([DEVICE] * n_rows)
+    df['nombre'] = [f"d{i}" for i in range(n_rows)]
+    df['potencia_w'] = rng.uniform(0.1, 50, n_rows).round(3)
+    df['horas_uso_diario'] = rng.uniform(0, 26, n_rows).round(2)
+    df['peso_final_g'] = rng.uniform(100, 210, n_rows).round(1)
+    file = io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+    file.name = 'dispositivos.csv'
+    return file
+
+def run_stream(workers, monkeypatch):
+    # Small chunks and tasks so the stream spans several of each
+    monkeypatch.setattr(scoring_service, 'TASK_ROWS', 300)
+    results, errors = io.StringIO(), io.StringIO()
+    frames = iter_devices_file(csv_file(3000), chunk_rows=700)
+    summary = score_stream(frames, RECOMMENDED_WEIGHTS, output=results, workers=workers,
+                           errors_output=errors, min_rows=1)
+    return summary, results.getvalue(), errors.getvalue()
+
+def test_parallel_stream_matches_single_process(monkeypatch):
+    serial = run_stream(1, monkeypatch)
+    parallel = run_stream(2, monkeypatch)
+    assert serial[0]['rejected_count'] > 0
+    assert serial[0]['device_count'] + serial[0]['rejected_count'] == 3000
+    assert parallel == serial
+
+def test_large_files_use_the_pool_by_default():
+    assert parallel_min_rows(1) == float('inf')
+    assert parallel_min_rows(2) <= DEFAULT_CHUNK_ROWS
@@ -0,0 +1,26 @@
+import numpy as np
+import uncertainty
+from uncertainty import propagate_uncertainty
+
+COLUMNS = {
+    'power': [2, 3], 'hours': [24, 10], 'days': [365, 200], 'weight': [0.1, 0.2], 'life': [5, 3],
+    'renewable_energy': [30, 50], 'functionality': [8, 5], 'recyclability': [65, 40],
+    'B': [2, 0], 'Wb': [50, 0], 'M': [1, 3], 'C': [2, 1], 'Wc': [20, 5], 'W0': [200, 100], 'W': [180, 100]
+}
+
+def test_perturbed_devices_are_valid(monkeypatch):
+    drawn = {}
+    calculate_metrics = uncertainty.FleetSustainability.calculate_metrics
+
+    def spy(self, chunk):
+        drawn.update({field: np.array(values) for field, values in chunk.items()})
+        return calculate_metrics(self, chunk)
+
+    monkeypatch.setattr(uncertainty.FleetSustainability, 'calculate_metrics', spy)
+    spread = {'B': ('normal', 0.5), 'M': ('uniform', 0.8), 'C': ('lognormal', 0.5),
+              'W0': ('normal', 0.2), 'W': ('normal', 0.2)}
+    propagate_uncertainty(COLUMNS, spread, n_samples=2000, seed=1)
+    for field in ('B', 'M', 'C'):
+        assert np.array_equal(drawn[field], np.rint(drawn[field]))
+        assert drawn[field].min() >= 0
+    assert (drawn['W'] <= drawn['W0']).all()
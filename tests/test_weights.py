@@ -0,0 +1,71 @@
+import json
+import numpy as np
+import pytest
+import weights
+
+def test_corrupt_random_index_cache_is_recomputed(tmp_path, monkeypatch):
+    cache = tmp_path / 'random_index.json'
+    cache.write_text('{"21": 1.6', encoding='utf-8')
+    monkeypatch.setattr(weights, 'RANDOM_INDEX_CACHE', str(cache))
+    monkeypatch.setattr(weights, '_simulated_random_index', None)
+    monkeypatch.setattr(weights, 'simulate_random_index', lambda n: 1.7)
+    assert weights.random_index(21) == 1.7
+    assert json.loads(cache.read_text(encoding='utf-8')) == {'21': 1.7}
+    assert [p.name for p in tmp_path.iterdir()] == ['random_index.json']
+
+def test_repair_suggestions_are_cached_by_matrix_content(monkeypatch):
+    calls = []
+    monkeypatch.setattr(weights, 'REPAIR_CACHE', weights.ContentCache(maxsize=4))
+    monkeypatch.setattr(weights, 'repair_consistency', lambda matrix: calls.append(1) or [])
+    matrix = np.array([[1, 9, 0.2], [1 / 9, 1, 9], [5, 1 / 9, 1]])
+    weights.repair_consistency_cached(matrix)
+    weights.repair_consistency_cached(matrix.copy())
+    assert len(calls) == 1
+    matrix[0, 1] = 7
+    weights.repair_consistency_cached(matrix)
+    assert len(calls) == 2
+
+def random_matrices(count, n, seed=0):
+    """Random reciprocal comparison matrices on the Saaty scale."""
+    rng = np.random.default_rng(seed)
+    rows, cols = np.triu_indices(n, 1)
+    matrices = np.ones((count, n, n))
+    values = rng.choice(weights.SAATY_SCALE, size=(count, len(rows)))
+    matrices[:, rows, cols] = values
+    matrices[:, cols, rows] = 1 / values
+    return matrices
+
+def test_batch_solution_matches_single_matrices():
+    matrices = random_matrices(50, 6)
+    batch_weights, lambda_max, ci, cr = weights.ahp_eigen_batch(matrices)
+    for k, matrix in enumerate(matrices):
+        result = weights.ahp_eigen(matrix)
+        assert np.allclose(batch_weights[k], result.weights, rtol=0, atol=1e-10)
+        assert lambda_max[k] == pytest.approx(result.lambda_max, rel=1e-10)
+        assert ci[k] == pytest.approx(result.ci, rel=1e-8, abs=1e-12)
+        assert cr[k] == pytest.approx(result.cr, rel=1e-8, abs=1e-12)
+
+def test_incremental_updates_match_a_fresh_solution():
+    matrix = random_matrices(1, 8)[0]
+    state = weights.AHPState(matrix)
+    rng = np.random.default_rng(1)
+    for _ in range(30):
+        i, j = rng.choice(8, size=2, replace=False)
+        state.set(i, j, float(rng.choice(weights.SAATY_SCALE)))
+        assert np.allclose(state.matrix * state.matrix.T, 1)
+        fresh = weights.ahp_eigen(state.matrix.copy())
+        assert np.allclose(state.weights, fresh.weights, rtol=0, atol=1e-10)
+        assert state.cr == pytest.approx(fresh.cr, rel=1e-8, abs=1e-12)
+    assert not state.set(0, 1, state.matrix[0, 1])
+
+def test_ranking_weights_reproduce_a_consistent_ranking():
+    rng = np.random.default_rng(0)
+    normalized = rng.uniform(0, 10, size=(12, len(weights.METRIC_CODES)))
+    target = rng.dirichlet(np.ones(len(weights.METRIC_CODES)))
+    ranking = list(np.argsort(-(normalized @ target)))
+    learned, agreement = weights.weights_from_ranking(normalized, ranking, margin=0.01)
+    vector = np.array([learned[m] for m in weights.METRIC_CODES])
+    assert vector.min() >= 0
+    assert vector.sum() == pytest.approx(1)
+    assert agreement == 1.0
+    assert list(np.argsort(-(normalized @ vector))) == ranking
@@ -0,0 +1,188 @@
+# uncertainty.py
+import numpy as np
+from model import FleetSustainability
+from fleet import METRIC_CODES, weights_vector
+from utils.constants import DEVICE_FIELD_TYPES, DEVICE_FIELD_RANGES
+
+# Supported distributions. Every spread is relative to the nominal input value:
+#   ('normal', rel_sd)                 value * N(1, rel_sd)
+#   ('lognormal', sigma)               value * LogNormal(0, sigma)
+#   ('uniform', rel_halfwidth)         value * U(1 - h, 1 + h)
+#   ('triangular', rel_low, rel_high)  value * Tri(1 - low, 1, 1 + high)
+DISTRIBUTIONS = ('normal', 'lognormal', 'uniform', 'triangular')
+
+# Number of (device, sample) pairs evaluated per chunk, bounds peak memory
+CHUNK_ELEMENTS = 1_000_000
+
+# Rounds of redrawing for samples that fall outside the valid range of their field
+MAX_REDRAWS = 20
+
+def _draw_factors(rng, spec, shape):
+    """Draws multiplicative perturbation factors for one input field."""
+    kind = spec[0]
+    if kind == 'normal':
+        return 1.0 + spec[1] * rng.standard_normal(shape)
+    if kind == 'lognormal':
+        return rng.lognormal(0.0, spec[1], shape)
+    if kind == 'uniform':
+        return rng.uniform(1.0 - spec[1], 1.0 + spec[1], shape)
+    if kind == 'triangular':
+        return rng.triangular(1.0 - spec[1], 1.0, 1.0 + spec[2], shape)
+    raise ValueError(f"Distribución no soportada: {kind}")
+
+def _out_of_range(values, field):
+    minimum, maximum, exclusive = DEVICE_FIELD_RANGES[field]
+    out = (values <= minimum) if exclusive else (values < minimum)
+    if maximum is not None:
+        out |= values > maximum
+    return out
+
+def _perturb(rng, field, base, spec, shape):
+    """Perturbs nominal values of one field; counts (B, M, C) are rounded to whole numbers."""
+    values = base * _draw_factors(rng, spec, shape)
+    if DEVICE_FIELD_TYPES[field] is int:
+        np.rint(values, out=values)
+    return values
+
+def _draw_values(rng, field, base, spec, shape):
+    """Draws perturbed values of one field, truncated to its valid range.
+
+    Samples outside DEVICE_FIELD_RANGES (e.g. a negative power from a wide normal
+    spread) are redrawn, so the perturbation follows the distribution truncated to
+    the valid range; devices whose nominal value is already out of range are left as
+    they are. The few samples still invalid after MAX_REDRAWS rounds are clipped.
+    """
+    base = np.broadcast_to(base, shape)
+    values = _perturb(rng, field, base, spec, shape)
+    nominal_ok = ~_out_of_range(base, field)
+    for _ in range(MAX_REDRAWS):
+        bad = _out_of_range(values, field) & nominal_ok
+        if not bad.any():
+            return values
+        values[bad] = _perturb(rng, field, base[bad], spec, int(bad.sum()))
+    minimum, maximum, _ = DEVICE_FIELD_RANGES[field]
+    bad = _out_of_range(values, field) & nominal_ok
+    values[bad] = np.clip(values[bad], minimum, maximum)
+    return values
+
+def _limit_final_weight(rng, chunk, base, uncertainty):
+    """Keeps the perturbed final weight W within the initial weight W0.
+
+    Samples with W > W0 are redrawn (both weights, where uncertain), so the pair
+    follows its distribution truncated to W <= W0; devices whose nominal W already
+    exceeds W0 are left as they are. Samples still invalid after MAX_REDRAWS rounds
+    get equal weights.
+    """
+    fields = [field for field in ('W0', 'W') if field in uncertainty]
+    if not fields:
+        return
+    shape = chunk['W'].shape
+    nominal_ok = np.broadcast_to(base['W'] <= base['W0'], shape)
+    for _ in range(MAX_REDRAWS):
+        bad = (chunk['W'] > chunk['W0']) & nominal_ok
+        if not bad.any():
+            return
+        for field in fields:
+            field_base = np.broadcast_to(base[field], shape)[bad]
+            chunk[field][bad] = _draw_values(rng, field, field_base, uncertainty[field], field_base.shape)
+    bad = (chunk['W'] > chunk['W0']) & nominal_ok
+    if 'W' in uncertainty:
+        chunk['W'][bad] = chunk['W0'][bad]
+    else:
+        chunk['W0'][bad] = chunk['W'][bad]
+
+def _weights_matrix(weights, n_devices):
+    """Returns a (devices x metrics) weight matrix from a dict, a vector or a matrix."""
+    if weights is None:
+        weights = FleetSustainability().weights
+    if isinstance(weights, dict):
+        weights = weights_vector(weights)
+    return np.broadcast_to(np.asarray(weights, dtype=float), (n_devices, len(METRIC_CODES)))
+
+# Function to propagate input uncertainty through the eight metrics
+def propagate_uncertainty(columns, uncertainty, weights=None, n_samples=1000, confidence=0.95,
+                          selected=None, chunk_size=None, seed=None, on_progress=None):
+    """Monte Carlo propagation of uncertain device inputs to the sustainability index.
+
+    Each device is evaluated with `n_samples` perturbed copies of its inputs. Devices
+    are processed in chunks so that at most CHUNK_ELEMENTS samples are held in memory
+    per field, which keeps 10k devices x 10k samples tractable. Perturbed values are
+    kept within the valid range of each field (see _draw_values), counts stay whole
+    numbers and the final weight stays within the initial one (see _limit_final_weight).
+
+    Args:
+        columns: DataFrame or dict of array-likes with the nominal device inputs
+        uncertainty (dict): Field name -> distribution spec (see DISTRIBUTIONS); fields
+            not listed are treated as exact
+        weights: Weights dict, metric vector, or (devices x metrics) matrix for per-device weights
+        n_samples (int): Samples drawn per device
+        confidence (float): Width of the reported confidence intervals
+        selected (array-like): Boolean mask of the devices included in the global index
+            (all by default)
+        chunk_size (int): Devices per chunk (derived from CHUNK_ELEMENTS by default)
+        seed (int): Optional seed for reproducibility
+        on_progress: Optional callback(devices done, total devices), called after each chunk
+
+    Returns:
+        dict: Per-device 'index_mean', 'index_std', 'index_lower', 'index_upper' arrays and
+        the global index 'global_mean', 'global_lower', 'global_upper' and 'global_samples'
+    """
+    for field, spec in uncertainty.items():
+        if field not in DEVICE_FIELD_TYPES:
+            raise ValueError(f"Campo desconocido: {field}")
+        if spec[0] not in DISTRIBUTIONS:
+            raise ValueError(f"Distribución no soportada: {spec[0]}")
+
+    nominal = {field: np.asarray(columns[field], dtype=float) for field in DEVICE_FIELD_TYPES}
+    n_devices = len(nominal['power'])
+    weights = _weights_matrix(weights, n_devices)
+    selected = np.ones(n_devices, dtype=bool) if selected is None else np.asarray(selected, dtype=bool)
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_ELEMENTS // n_samples)
+
+    rng = np.random.default_rng(seed)
+    engine = FleetSustainability()
+    tail = (1 - confidence) / 2 * 100
+    index_mean = np.empty(n_devices)
+    index_std = np.empty(n_devices)
+    index_lower = np.empty(n_devices)
+    index_upper = np.empty(n_devices)
+    global_sum = np.zeros(n_samples)
+
+    for start in range(0, n_devices, chunk_size):
+        stop = min(start + chunk_size, n_devices)
+        shape = (stop - start, n_samples)
+        base = {field: values[start:stop, None] for field, values in nominal.items()}
+        chunk = {}
+        for field, values in base.items():
+            if field in uncertainty:
+                chunk[field] = _draw_values(rng, field, values, uncertainty[field], shape)
+            else:
+                chunk[field] = np.broadcast_to(values, shape)
+        _limit_final_weight(rng, chunk, base, uncertainty)
+
+        raw_metrics = engine.calculate_metrics(chunk)
+        index = np.zeros(shape)
+        for j, metric in enumerate(METRIC_CODES):
+            index += engine.normalize_metric(metric, raw_metrics[metric]) * weights[start:stop, j, None]
+
+        index_mean[start:stop] = index.mean(axis=1)
+        index_std[start:stop] = index.std(axis=1)
+        index_lower[start:stop], index_upper[start:stop] = np.percentile(index, [tail, 100 - tail], axis=1)
+        global_sum += index[selected[start:stop]].sum(axis=0)
+        if on_progress is not None:
+            on_progress(stop, n_devices)
+
+    n_selected = int(selected.sum())
+    global_samples = global_sum / n_selected if n_selected else np.full(n_samples, np.nan)
+    global_lower, global_upper = np.percentile(global_samples, [tail, 100 - tail])
+    return {
+        'index_mean': index_mean,
+        'index_std': index_std,
+        'index_lower': index_lower,
+        'index_upper': index_upper,
+        'global_mean': float(global_samples.mean()),
+        'global_lower': float(global_lower),
+        'global_upper': float(global_upper),
+        'global_samples': global_samples
+    }
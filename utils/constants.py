@@ -47,6 +47,45 @@ FORM_KEYS = {
     'W': (180, "Peso final del dispositivo después del uso.")
 }
 
+# Numeric type of each device input field, used to coerce imported values before scoring
+DEVICE_FIELD_TYPES = {
+    'power': float,
+    'hours': float,
+    'days': float,
+    'weight': float,
+    'life': float,
+    'renewable_energy': float,
+    'functionality': float,
+    'recyclability': float,
+    'B': int,
+    'Wb': float,
+    'M': int,
+    'C': int,
+    'Wc': float,
+    'W0': float,
+    'W': float
+}
+
+# Valid range of each device input field (see README): (minimum, maximum, minimum excluded).
+# A None maximum means unbounded; the final weight W is also checked against W0.
+DEVICE_FIELD_RANGES = {
+    'power': (0, None, True),
+    'hours': (0, 24, False),
+    'days': (0, 365, False),
+    'weight': (0, None, True),
+    'life': (0, None, True),
+    'renewable_energy': (0, 100, False),
+    'functionality': (1, 10, False),
+    'recyclability': (0, 100, False),
+    'B': (0, None, False),
+    'Wb': (0, None, False),
+    'M': (0, None, False),
+    'C': (0, None, False),
+    'Wc': (0, None, False),
+    'W0': (0, None, True),
+    'W': (0, None, True)
+}
+
 # Descriptions and units for each template field
 IMPORT_COLUMN_DESCRIPTIONS = {
     "nombre": "Nombre descriptivo del dispositivo IoT.",
@@ -101,16 +140,17 @@ DASHBOARD_GUIDE = f"""
    - Puedes completar el formulario manualmente **o importar una lista de dispositivos usando la plantilla**.
    - {IMPORT_WARNING}
    - La plantilla incluye una hoja de ayuda con la descripción y unidad de cada campo.
-   - Sube el archivo en formato Excel, CSV o JSON y revisa los datos antes de añadirlos al sistema.
+   - Sube uno o varios archivos en formato Excel, CSV, JSON, JSON Lines, Parquet o Arrow (o un ZIP que los contenga) y revisa los datos antes de añadirlos al sistema.
    - Tras importar, puedes añadir los dispositivos individualmente o todos juntos.
-   - Al añadir un nuevo dispositivo, los resultados globales previos se eliminan automáticamente. Deberás recalcular el índice global para ver los resultados actualizados.
+   - Al añadir un nuevo dispositivo, los resultados globales ya calculados se actualizan automáticamente.
 
 3. **Gestiona tu lista de dispositivos**
    - Puedes ver los detalles completos de cada dispositivo pulsando **'Mostrar detalles'**.
    - Dentro de los detalles, consulta los datos de entrada y los pesos utilizados para ese dispositivo, junto con el nombre de la configuración de pesos aplicada.
-   - Para eliminar un dispositivo, marca la casilla **'Eliminar dispositivo'** y confirma la acción con el botón correspondiente. Al eliminar cualquier dispositivo, los resultados globales se eliminan y deberás recalcular.
+   - Para eliminar un dispositivo, marca la casilla **'Eliminar dispositivo'** y confirma la acción con el botón correspondiente. Al eliminar cualquier dispositivo, los resultados globales se actualizan automáticamente.
+   - Puedes recalcular el índice de todos los dispositivos con la configuración de pesos activa usando el botón **'Aplicar pesos activos a todos los dispositivos'**.
    - Puedes seleccionar o deseleccionar dispositivos para el cálculo global usando los checkboxes **'Incluir en cálculo'**. La lista exportada de dispositivos incluye todos los dispositivos añadidos, independientemente de su estado de selección.
-   - Puedes descargar la lista actual de dispositivos en formato Excel, CSV o JSON usando el botón **'Descargar lista de dispositivos añadidos'**. Los archivos exportados mantienen los nombres de columnas de la plantilla para facilitar su reutilización.
+   - Puedes descargar la lista actual de dispositivos en formato Excel, CSV, JSON, Parquet o Arrow usando el botón **'Descargar lista de dispositivos añadidos'**. Los archivos exportados mantienen los nombres de columnas de la plantilla para facilitar su reutilización.
 
 4. **Calcula y analiza los resultados**
    - Pulsa **'Calcular Índice de Sostenibilidad'** para ver los resultados individuales y globales.
@@ -131,7 +171,7 @@ DASHBOARD_GUIDE = f"""
      - Hoja de dispositivos con todos los datos y su estado de inclusión en el cálculo
      - Hojas de detalle individuales para cada dispositivo
      - El nombre del archivo incluye el índice global, número de dispositivos incluidos y fecha
-   - **Lista de dispositivos:** Usa el botón **'Descargar lista de dispositivos añadidos'** para exportar los datos en formato Excel, CSV o JSON:
+   - **Lista de dispositivos:** Usa el botón **'Descargar lista de dispositivos añadidos'** para exportar los datos en formato Excel, CSV, JSON, Parquet o Arrow:
      - Puedes elegir incluir solo los dispositivos seleccionados para el cálculo global
      - Los archivos exportados mantienen los nombres de columnas de la plantilla
      - El nombre del archivo incluye el número de dispositivos y la fecha
@@ -139,9 +179,9 @@ DASHBOARD_GUIDE = f"""
 ---
 
 **Consejos y advertencias:**
-- Si cambias los pesos o la lista de dispositivos, recuerda recalcular el índice global para obtener resultados actualizados.
+- Si cambias los pesos, solo se aplican a los dispositivos que añadas a partir de ese momento, salvo que uses **'Aplicar pesos activos a todos los dispositivos'**.
 - Si los dispositivos fueron evaluados con diferentes configuraciones de pesos, los índices individuales pueden no ser directamente comparables.
-- El dashboard elimina automáticamente los resultados globales al añadir o eliminar dispositivos para evitar mostrar información desactualizada.
+- Una vez calculado, el índice global se actualiza automáticamente al añadir, eliminar, seleccionar o deseleccionar dispositivos.
 - Puedes guardar y cargar diferentes configuraciones de pesos tanto para el ajuste manual como para los pesos calculados mediante comparación por pares.
 - El nombre de la configuración de pesos utilizada se guarda y se muestra en todos los resultados y exportaciones para máxima trazabilidad.
 - Los archivos exportados incluyen información sobre qué dispositivos fueron incluidos en el cálculo global para facilitar el seguimiento y la trazabilidad.
@@ -1,6 +1,8 @@
 import pandas as pd
 import streamlit as st
-from utils.constants import RECOMMENDED_WEIGHTS
+from utils.constants import RECOMMENDED_WEIGHTS, METRIC_NAMES
+from cache import ConfigIndex, content_key
+from fleet import weights_vector
 
 def to_dict_flat(d):
     """
@@ -20,18 +22,67 @@ def to_dict_flat(d):
         return d
     return dict(d)
 
-def extract_weight_value(v):
-    if isinstance(v, dict):
-        for val in v.values():
+def weights_frame(weights):
+    """Display table of a plain {metric: weight} configuration: name, weight and importance."""
+    metrics = list(weights.keys())
+    df = pd.DataFrame({
+        'Métrica': [METRIC_NAMES[k] for k in metrics],
+        'Peso': [float(weights[k]) for k in metrics]
+    })
+    # Relative importance with balanced criteria
+    df['Importancia'] = df['Peso'].apply(
+        lambda x: '🔴 Alta' if x >= 0.20 else '🟡 Media' if 0.10 < x < 0.20 else '🟢 Baja'
+    )
+    return df
+
+def weights_key(weights):
+    """Content key of a weights configuration (plain or AHP format), normalized to sum 1."""
+    vector = weights_vector(weights)
+    total = vector.sum()
+    return content_key(vector / total if total else vector)
+
+def _config_weights(kind, config):
+    return config['weights'] if kind == 'ahp' else config
+
+def _configs(kind):
+    return st.session_state.ahp_configurations if kind == 'ahp' else st.session_state.saved_weights
+
+def config_index(kind):
+    """Returns the ConfigIndex of the saved configurations of one kind ('manual' or 'ahp').
+
+    Kept in session state and rebuilt only if it no longer matches the number of
+    saved configurations (e.g. after the state was reset).
+    """
+    indexes = st.session_state.setdefault('config_indexes', {})
+    configs = _configs(kind)
+    index = indexes.get(kind)
+    if index is None or len(index) != len(configs):
+        index = ConfigIndex()
+        for name, config in configs.items():
             try:
-                return float(val)
-            except (ValueError, TypeError):
+                index.add(name, weights_key(_config_weights(kind, config)))
+            except (KeyError, ValueError, TypeError):
                 continue
-        raise ValueError("No se encontró valor numérico en el peso.")
+        indexes[kind] = index
+    return index
+
+def register_config(kind, name):
+    """Indexes a configuration just saved under `name`."""
+    index = config_index(kind)
+    index.add(name, weights_key(_config_weights(kind, _configs(kind)[name])))
+
+def unregister_config(kind, name):
+    """Removes a configuration from the index (call before deleting it)."""
+    config_index(kind).remove(name)
+
+def find_config_name(kind, weights):
+    """Returns the name of the saved configuration with these weights, or None, in O(1)."""
     try:
-        return float(v)
-    except (ValueError, TypeError):
-        raise ValueError(f"No se pudo convertir el valor {v} a número.")
+        key = weights_key(weights)
+    except (KeyError, ValueError, TypeError):
+        return None
+    name = config_index(kind).find(key)
+    return name if name in _configs(kind) else None
 
 def create_weights_snapshot(user_weights, weights_mode):
     """Creates a consistent snapshot of the weights used.
@@ -65,28 +116,19 @@ def create_weights_snapshot(user_weights, weights_mode):
     if weights_mode == "Calcular nuevos pesos":
         config_name = "Pesos Calculados"
         if 'ahp_weights' in st.session_state:
-            for ahp_config_name, config in st.session_state.ahp_configurations.items():
-                if to_dict_flat(config['weights']) == to_dict_flat(clean_weights):
-                    config_name = f"Configuración Calculada: {ahp_config_name}"
-                    break
+            ahp_config_name = find_config_name('ahp', clean_weights)
+            if ahp_config_name is not None:
+                config_name = f"Configuración Calculada: {ahp_config_name}"
     elif weights_mode == "Ajuste Manual":
         recommended_weights = RECOMMENDED_WEIGHTS
         if to_dict_flat(clean_weights) == to_dict_flat(recommended_weights):
             config_name = "Pesos Recomendados"
         else:
             config_name = "Pesos Manuales Personalizados"
-            for manual_config_name, config in st.session_state.saved_weights.items():
-                try:
-                    # Normalize saved configuration weights for comparison
-                    normalized_config = {k: float(v) for k, v in config.items()}
-                    total = sum(normalized_config.values())
-                    if total != 1.0:
-                        normalized_config = {k: v/total for k, v in normalized_config.items()}
-                    if to_dict_flat(normalized_config) == to_dict_flat(clean_weights):
-                        config_name = f"Configuración Manual: {manual_config_name}"
-                        break
-                except Exception:
-                    continue
+            # Saved configurations are indexed by their normalized weights
+            manual_config_name = find_config_name('manual', clean_weights)
+            if manual_config_name is not None:
+                config_name = f"Configuración Manual: {manual_config_name}"
     
     return {
         "mode": weights_mode,
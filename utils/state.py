@@ -1,6 +1,8 @@
 import streamlit as st
 import numpy as np
+from datetime import datetime
 from utils.constants import METRIC_NAMES, RECOMMENDED_WEIGHTS
+from fleet import DeviceFleet, PendingImports
 
 def initialize_manual_weights():
     """Initializes manual weights with recommended values."""
@@ -14,9 +16,7 @@ def initialize_manual_weights():
 def initialize_state():
     """Initializes application state variables."""
     if 'devices' not in st.session_state:
-        st.session_state.devices = []
-    if 'selected_devices' not in st.session_state:
-        st.session_state.selected_devices = {}
+        st.session_state.devices = DeviceFleet()
     if 'weight_mode_radio' not in st.session_state:
         st.session_state.weight_mode_radio = "Pesos Recomendados"
     if 'ahp_weights' not in st.session_state:
@@ -30,7 +30,7 @@ def initialize_state():
     if 'show_import' not in st.session_state:
         st.session_state.show_import = False
     if 'imported_devices' not in st.session_state:
-        st.session_state.imported_devices = []
+        st.session_state.imported_devices = PendingImports()
     if 'import_message' not in st.session_state:
         st.session_state.import_message = None
     if 'restore_manual_weights' not in st.session_state:
@@ -54,10 +54,19 @@ def initialize_state():
     if 'weight_mode_radio' not in st.session_state and not st.session_state.get('edit_mode', False):
         st.session_state.weight_mode_radio = "Pesos Recomendados"
 
+def refresh_global_result():
+    """Updates an already calculated global result from the fleet's running aggregates.
+
+    Called after adding, deleting or (de)selecting devices instead of discarding
+    the result; does nothing if the global index has not been calculated yet.
+    """
+    if st.session_state.get('global_result'):
+        st.session_state.global_result = st.session_state.devices.global_result()
+        st.session_state.global_calculation_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
 def reset_state():
     """Resets all state variables to their initial values."""
-    st.session_state.devices = []
-    st.session_state.selected_devices = {}
+    st.session_state.devices = DeviceFleet()
     st.session_state.weight_mode_radio = "Pesos Recomendados"
     st.session_state.ahp_weights = None
     st.session_state.manual_weights = RECOMMENDED_WEIGHTS
@@ -65,7 +74,7 @@ def reset_state():
     st.session_state.ahp_configurations = {}
     st.session_state.saved_weights = {}
     st.session_state.show_import = False
-    st.session_state.imported_devices = []
+    st.session_state.imported_devices = PendingImports()
     st.session_state.import_message = None
     st.session_state.restore_manual_weights = False
     st.session_state.individual_manual_weights = {}
@@ -78,8 +87,10 @@ def reset_state():
     st.session_state.weight_mode_radio = "Pesos Recomendados"
     # Remove additional variables
     for var in [
-        'saved_weight_mode', 'global_result', 'ahp_weights', 'ahp_results',
-        'show_ahp_weights_table', 'edit_mode', 'editing_device', 'edit_load_completed'
+        'saved_weight_mode', 'global_result', 'ahp_weights', 'ahp_results', 'ahp_state',
+        'show_ahp_weights_table', 'edit_mode', 'editing_device', 'edit_load_completed',
+        'ranking_agreement', 'ranking_weights', 'comparison_ranges', 'comparison_ranges_editor',
+        'ahp_weight_bounds', 'ahp_panel', 'ahp_panel_reviewer'
     ]:
         if var in st.session_state:
             del st.session_state[var] 
\ No newline at end of file
@@ -1,73 +1,469 @@
 # weights.py
-import pandas as pd
+import os
+import json
+import tempfile
+from typing import NamedTuple
 import numpy as np
+from cache import ContentCache, content_key
+from metrics import METRIC_CODES
 
-# Function to calculate weights using AHP method
-def ahp_attributes(criteria_df):
-    column_sums = np.array(criteria_df.sum(numeric_only=True))
-    normalized_matrix = criteria_df.div(column_sums, axis=1)
-    weights = pd.DataFrame(
-        normalized_matrix.mean(axis=1),
-        index=criteria_df.index,
-        columns=['weight']
-    )
-    return weights.transpose()
-
-# Function to calculate the consistency ratio of the comparison matrix
-def consistency_ratio(weights, comparison_matrix, verbose=False):
-    random_matrix = {
-        1: 0.00, 2: 0.00, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41,
-        9: 1.45, 10: 1.49, 11: 1.51, 12: 1.48, 13: 1.56, 14: 1.57, 15: 1.59,
-        16: 1.605, 17: 1.61, 18: 1.615, 19: 1.62, 20: 1.625
-    }
-
-    temp_df = comparison_matrix.multiply(np.array(weights.loc['weight']), axis=1)
-    temp_df['sum'] = temp_df.sum(axis=1)
-    lambda_max = temp_df['sum'].div(np.array(weights.transpose()['weight'])).mean()
-
-    ci = round((lambda_max - len(comparison_matrix)) / (len(comparison_matrix) - 1), 3)
-    cr = round(ci / random_matrix[len(comparison_matrix)], 3)
-
-    if verbose:
-        print(f"consistency index: {ci}")
-        print(f"consistency ratio: {cr}")
-        print("The matrix is consistent." if cr < 0.1 else "The matrix is not consistent.")
-
-    return ci, cr
+class AHPResult(NamedTuple):
+    """Solution of a comparison matrix: priority vector and consistency."""
+    weights: np.ndarray
+    lambda_max: float
+    ci: float
+    cr: float
+
+    @property
+    def consistent(self):
+        return self.cr < 0.1
+
+    def as_dict(self, metrics=METRIC_CODES):
+        """Returns the weights as a plain {metric: weight} configuration."""
+        return dict(zip(metrics, self.weights.tolist()))
+
+# Function to approximate the AHP weights (normalized column average)
+def column_average_weights(matrix):
+    """Normalizes each column of the comparison matrix to sum 1 and averages the rows."""
+    matrix = np.asarray(matrix, dtype=float)
+    return (matrix / matrix.sum(axis=0)).mean(axis=1)
+
+# Random consistency index (RI) by matrix size, published values
+RANDOM_INDEX = {
+    1: 0.00, 2: 0.00, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41,
+    9: 1.45, 10: 1.49, 11: 1.51, 12: 1.48, 13: 1.56, 14: 1.57, 15: 1.59,
+    16: 1.605, 17: 1.61, 18: 1.615, 19: 1.62, 20: 1.625
+}
+
+# Values of the Saaty scale allowed in a comparison (1/9 ... 1 ... 9)
+SAATY_SCALE = np.array([1 / v for v in range(9, 1, -1)] + list(range(1, 10)), dtype=float)
+
+# Local cache of the random indices simulated for larger matrices
+RANDOM_INDEX_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'random_index.json')
+
+# Random matrices drawn per size when simulating a random index
+RANDOM_INDEX_SAMPLES = 20_000
+
+# Simulated indices, loaded from RANDOM_INDEX_CACHE on first use
+_simulated_random_index = None
+
+# Function to estimate the random index by Monte Carlo
+def simulate_random_index(n, n_samples=RANDOM_INDEX_SAMPLES, seed=0):
+    """Estimates the random consistency index of size n as the mean CI of random matrices.
+
+    Upper-triangle entries are drawn uniformly from the Saaty scale (1/9 ... 9) and
+    mirrored as reciprocals, as in Saaty's original simulation. Matrices are evaluated
+    in batches with ahp_eigen_batch, bounded to a few million entries per batch.
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = np.triu_indices(n, 1)
+    batch = max(1, 4_000_000 // (n * n))
+    ci_sum = 0.0
+    for start in range(0, n_samples, batch):
+        size = min(batch, n_samples - start)
+        values = rng.choice(SAATY_SCALE, size=(size, len(rows)))
+        matrices = np.ones((size, n, n))
+        matrices[:, rows, cols] = values
+        matrices[:, cols, rows] = 1 / values
+        _, lambda_max, _, _ = ahp_eigen_batch(matrices, tol=1e-9, ri=np.nan)
+        ci_sum += ((lambda_max - n) / (n - 1)).sum()
+    return float(ci_sum / n_samples)
+
+def _load_random_index():
+    """Reads the simulated random indexes of RANDOM_INDEX_CACHE; a missing or corrupt file reads as empty."""
+    try:
+        with open(RANDOM_INDEX_CACHE, encoding='utf-8') as f:
+            return {int(k): float(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError, TypeError, AttributeError):
+        # Corrupt entries are simulated again and the file rewritten
+        return {}
+
+def _save_random_index(values):
+    """Writes the simulated random indexes to RANDOM_INDEX_CACHE (atomically, like ContentCache)."""
+    directory = os.path.dirname(RANDOM_INDEX_CACHE)
+    tmp = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file and swap it in, so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(values, f, indent=2)
+        os.replace(tmp, RANDOM_INDEX_CACHE)
+    except OSError:
+        # Read-only installs still get the value for this session
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+def random_index(n):
+    """Returns the random consistency index for matrices of size n.
+
+    Sizes up to 20 use the published table. Larger sizes are simulated once with
+    simulate_random_index and persisted to RANDOM_INDEX_CACHE for later sessions.
+    """
+    global _simulated_random_index
+    if n in RANDOM_INDEX:
+        return RANDOM_INDEX[n]
+    if _simulated_random_index is None:
+        _simulated_random_index = _load_random_index()
+    if n not in _simulated_random_index:
+        _simulated_random_index[n] = simulate_random_index(n)
+        _save_random_index(_simulated_random_index)
+    return _simulated_random_index[n]
+
+# Function to calculate the exact AHP weights (principal eigenvector)
+def ahp_eigen(matrix, tol=1e-12, max_iter=1000, initial=None):
+    """Computes the principal eigenvector of a pairwise comparison matrix by power iteration.
+
+    Args:
+        matrix (array-like): (n x n) positive reciprocal comparison matrix
+        tol (float): Convergence tolerance on the largest change of any weight
+        max_iter (int): Maximum number of iterations
+        initial (array-like): Optional starting vector (warm start), e.g. the weights of
+            a previous version of the matrix; defaults to the normalized row geometric means
+
+    Returns:
+        AHPResult: weights summing to 1, lambda_max, CI and CR
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if initial is not None:
+        initial = np.asarray(initial, dtype=float)[None]
+    weights, lambda_max, ci, cr = ahp_eigen_batch(matrix[None], tol, max_iter, initial)
+    return AHPResult(weights[0], float(lambda_max[0]), float(ci[0]), float(cr[0]))
+
+# Local cache of AHP solutions, shared between sessions
+AHP_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'ahp')
+
+def _encode_ahp_result(result):
+    return {'weights': result.weights.tolist(), 'lambda_max': result.lambda_max, 'ci': result.ci, 'cr': result.cr}
+
+def _decode_ahp_result(data):
+    return AHPResult(np.asarray(data['weights'], dtype=float), float(data['lambda_max']), float(data['ci']), float(data['cr']))
+
+# AHP solutions by content_key() of the comparison matrix
+AHP_CACHE = ContentCache(maxsize=256, directory=AHP_CACHE_DIR, encode=_encode_ahp_result, decode=_decode_ahp_result)
+
+def ahp_eigen_cached(matrix):
+    """ahp_eigen with default settings, memoized in AHP_CACHE by matrix content."""
+    key = content_key(matrix)
+    result = AHP_CACHE.get(key)
+    if result is None:
+        result = ahp_eigen(matrix)
+        AHP_CACHE.put(key, result)
+    return result._replace(weights=result.weights.copy())
+
+# Function to calculate the AHP weights of many comparison matrices at once
+def ahp_eigen_batch(matrices, tol=1e-12, max_iter=1000, initial=None, ri=None):
+    """Vectorized ahp_eigen over a stack of comparison matrices of the same size.
+
+    Args:
+        matrices (array-like): (k x n x n) stack, e.g. one matrix per reviewer
+        tol (float): Convergence tolerance, checked on every matrix of the stack
+        max_iter (int): Maximum number of iterations
+        initial (array-like): Optional (k x n) starting vectors
+        ri (float): Random index used for the CR (looked up for the matrix size by default)
+
+    Returns:
+        tuple: (k x n) weights and (k,) arrays lambda_max, CI and CR
+    """
+    matrices = np.asarray(matrices, dtype=float)
+    n = matrices.shape[-1]
+    if initial is None:
+        weights = np.exp(np.log(matrices).mean(axis=2))
+    else:
+        weights = np.asarray(initial, dtype=float)
+    weights = weights / weights.sum(axis=1, keepdims=True)
+
+    for _ in range(max_iter):
+        product = np.einsum('kij,kj->ki', matrices, weights)
+        new_weights = product / product.sum(axis=1, keepdims=True)
+        converged = np.abs(new_weights - weights).max() < tol
+        weights = new_weights
+        if converged:
+            break
+
+    # With weights summing to 1, A·w = lambda_max·w gives lambda_max = sum(A·w)
+    lambda_max = np.einsum('kij,kj->k', matrices, weights)
+    if n <= 2:
+        # Matrices of size 1 and 2 are always consistent
+        zeros = np.zeros(len(matrices))
+        return weights, lambda_max, zeros, zeros
+    ci = (lambda_max - n) / (n - 1)
+    cr = ci / (random_index(n) if ri is None else ri)
+    return weights, lambda_max, ci, cr
+
+class AHPState:
+    """Comparison matrix with its AHP solution kept up to date on single-cell edits.
+
+    Each edit changes one comparison and its reciprocal, then re-solves with
+    ahp_eigen warm-started from the previous weights, which typically converges
+    in a handful of iterations instead of starting from scratch.
+
+    Args:
+        matrix (np.ndarray): (n x n) comparison matrix, updated in place by set()
+        tol (float): Convergence tolerance of the solver
+    """
+    def __init__(self, matrix, tol=1e-12):
+        self.matrix = matrix
+        self.tol = tol
+        self.edits = 0
+        self.result = ahp_eigen_cached(matrix)
+
+    @property
+    def weights(self):
+        return self.result.weights
+
+    @property
+    def ci(self):
+        return self.result.ci
+
+    @property
+    def cr(self):
+        return self.result.cr
+
+    def set(self, i, j, value):
+        """Sets comparison (i, j) to `value` and (j, i) to its reciprocal.
+
+        Returns:
+            bool: True if the matrix changed (and the solution was updated)
+        """
+        if i == j or self.matrix[i, j] == value:
+            return False
+        self.matrix[i, j] = value
+        self.matrix[j, i] = 1 / value
+        self.edits += 1
+        self.result = ahp_eigen(self.matrix, self.tol, initial=self.weights)
+        return True
+
+# Function to aggregate the judgments of several reviewers
+def group_comparison_matrix(matrices, reviewer_weights=None):
+    """Aggregates a (k x n x n) stack of comparison matrices by element-wise geometric mean.
+
+    The geometric mean keeps the aggregated matrix reciprocal. `reviewer_weights`
+    optionally gives each reviewer a relative importance (equal by default).
+    """
+    logs = np.log(np.asarray(matrices, dtype=float))
+    if reviewer_weights is None:
+        return np.exp(logs.mean(axis=0))
+    reviewer_weights = np.asarray(reviewer_weights, dtype=float)
+    return np.exp(np.tensordot(reviewer_weights / reviewer_weights.sum(), logs, axes=1))
+
+# Function to calculate weights from triangular fuzzy comparisons
+def fuzzy_ahp(lower, middle, upper):
+    """Triangular fuzzy AHP by the fuzzy geometric mean (Buckley's method).
+
+    Each comparison is a triangular number (l, m, u) given as three (n x n) matrices;
+    reciprocity means (l, m, u) for (i, j) is (1/u, 1/m, 1/l) for (j, i). The fuzzy
+    weight of metric i is r_i / sum(r), with r_i the geometric mean of row i, which
+    on the bound matrices becomes (r_l / sum(r_u), r_m / sum(r_m), r_u / sum(r_l)).
+
+    Args:
+        lower, middle, upper (array-like): Bound matrices of the comparisons
+
+    Returns:
+        tuple: (lower weights, upper weights, crisp weights, CR of the middle matrix).
+        Crisp weights are the centroids (l + m + u) / 3 normalized to sum 1.
+    """
+    logs = np.log(np.stack([lower, middle, upper]).astype(float))
+    r_lower, r_middle, r_upper = np.exp(logs.mean(axis=2))
+    weights_lower = r_lower / r_upper.sum()
+    weights_middle = r_middle / r_middle.sum()
+    weights_upper = np.minimum(r_upper / r_lower.sum(), 1.0)
+    crisp = (weights_lower + weights_middle + weights_upper) / 3
+    return weights_lower, weights_upper, crisp / crisp.sum(), ahp_eigen(middle).cr
+
+# Function to calculate weights from interval comparisons
+def interval_ahp(lower, upper):
+    """Interval AHP: comparisons given as ranges (e.g. "between 3 and 5").
+
+    Treated as triangular fuzzy numbers whose most likely value is the geometric
+    midpoint sqrt(l * u), which keeps the midpoint matrix reciprocal. Same result
+    layout as fuzzy_ahp.
+    """
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    return fuzzy_ahp(lower, np.sqrt(lower * upper), upper)
+
+# Function to suggest edits that make an inconsistent matrix consistent
+def repair_consistency(matrix, threshold=0.1, max_edits=3, beam_width=8, max_suggestions=5):
+    """Searches for the smallest sets of Saaty-scale edits that bring CR under the threshold.
+
+    Every candidate edit replaces one comparison of the upper triangle (and its
+    reciprocal) by a value of SAATY_SCALE. All candidates of a round are stacked
+    and evaluated together with ahp_eigen_batch, warm-started from the weights of
+    the matrix they modify, so a round costs a few milliseconds. Sets of one edit
+    are searched exhaustively; larger sets grow from the `beam_width` candidates
+    with the lowest CR of the previous round.
+
+    Args:
+        matrix (array-like): (n x n) comparison matrix
+        threshold (float): CR to reach
+        max_edits (int): Largest number of edits in a suggestion
+        beam_width (int): Partial edit sets kept between rounds
+        max_suggestions (int): Maximum number of suggestions returned
+
+    Returns:
+        list: Suggestions of the smallest size found, sorted by weight change. Each is a
+        dict with 'edits' (list of (i, j, old value, new value)), 'cr', 'weights' and
+        'weight_change' (sum of absolute weight differences). Empty if the matrix is
+        already consistent or no set of up to `max_edits` edits is enough.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n = len(matrix)
+    base = ahp_eigen(matrix)
+    base_weights = base.weights
+    if not base.cr >= threshold:
+        return []
+    rows, cols = np.triu_indices(n, 1)
+
+    # Each state of the beam: (edits so far, matrix, weights)
+    beam = [((), matrix, base_weights)]
+    for _ in range(max_edits):
+        stacks, warm, edits = [], [], []
+        for state_edits, state_matrix, state_weights in beam:
+            edited = {(i, j) for i, j, _, _ in state_edits}
+            for i, j in zip(rows, cols):
+                if (i, j) in edited:
+                    continue
+                values = SAATY_SCALE[~np.isclose(SAATY_SCALE, state_matrix[i, j])]
+                candidates = np.repeat(state_matrix[None], len(values), axis=0)
+                candidates[:, i, j] = values
+                candidates[:, j, i] = 1 / values
+                stacks.append(candidates)
+                warm.append(np.broadcast_to(state_weights, (len(values), n)))
+                edits.extend(state_edits + ((int(i), int(j), float(matrix[i, j]), float(v)),) for v in values)
+        if not edits:
+            break
+        candidates = np.concatenate(stacks)
+        weights, _, _, cr = ahp_eigen_batch(candidates, initial=np.concatenate(warm))
+
+        solved = np.flatnonzero(cr < threshold)
+        if len(solved):
+            change = np.abs(weights[solved] - base_weights).sum(axis=1)
+            suggestions, seen = [], set()
+            for k in solved[np.argsort(change, kind='stable')]:
+                key = frozenset(edits[k])
+                if key in seen:
+                    continue
+                seen.add(key)
+                suggestions.append({
+                    'edits': list(edits[k]),
+                    'cr': float(cr[k]),
+                    'weights': weights[k],
+                    'weight_change': float(np.abs(weights[k] - base_weights).sum())
+                })
+                if len(suggestions) == max_suggestions:
+                    break
+            return suggestions
+
+        best = np.argsort(cr, kind='stable')[:beam_width]
+        beam = [(edits[k], candidates[k], weights[k]) for k in best]
+    return []
+
+# Repair suggestions by content_key() of the comparison matrix (kept in memory only)
+REPAIR_CACHE = ContentCache(maxsize=64)
+
+def repair_consistency_cached(matrix):
+    """repair_consistency with default settings, memoized in REPAIR_CACHE by matrix content."""
+    key = content_key(matrix)
+    suggestions = REPAIR_CACHE.get(key)
+    if suggestions is None:
+        suggestions = repair_consistency(matrix)
+        REPAIR_CACHE.put(key, suggestions)
+    return suggestions
+
+# Recommended weights, computed on first use
+_recommended_weights = None
 
 # Function to get recommended weights based on AHP and SDG
 def get_recommended_weights():
-    scores = {
-        'EC': 12,  # Energy Consumption
-        'CF': 11,  # Carbon Footprint
-        'EW': 9,   # Electronic Waste
-        'RE': 11,  # Renewable Energy Use
-        'EE': 9,   # Energy Efficiency
-        'PD': 8,   # Product Durability
-        'RC': 8,   # Recyclability
-        'MT': 5    # Maintenance
-    }
-    metrics = list(scores.keys())
-
-    def saaty_scale(d):
-        if d == 0: return 1
-        elif d == 1: return 2
-        elif d == 2: return 3
-        elif d == 3: return 5
-        elif d == 4: return 7
-        else: return 9
-
-    matrix = np.ones((len(metrics), len(metrics)))
-    for i in range(len(metrics)):
-        for j in range(len(metrics)):
-            if i != j:
-                diff = abs(scores[metrics[i]] - scores[metrics[j]])
-                val = saaty_scale(diff)
-                matrix[i, j] = val if scores[metrics[i]] > scores[metrics[j]] else 1 / val
-
-    criteria_df = pd.DataFrame(matrix, index=metrics, columns=metrics)
-    weights = ahp_attributes(criteria_df)
-    return weights.loc['weight'].to_dict()
+    global _recommended_weights
+    if _recommended_weights is None:
+        scores = {
+            'EC': 12,  # Energy Consumption
+            'CF': 11,  # Carbon Footprint
+            'EW': 9,   # Electronic Waste
+            'RE': 11,  # Renewable Energy Use
+            'EE': 9,   # Energy Efficiency
+            'PD': 8,   # Product Durability
+            'RC': 8,   # Recyclability
+            'MT': 5    # Maintenance
+        }
+        metrics = list(scores.keys())
+        values = np.array(list(scores.values()))
+
+        # Saaty value by score difference: 0 -> 1, 1 -> 2, 2 -> 3, 3 -> 5, 4 -> 7, 5+ -> 9
+        saaty_scale = np.array([1, 2, 3, 5, 7, 9], dtype=float)
+        diff = np.abs(values[:, None] - values[None, :])
+        val = saaty_scale[np.minimum(diff, 5)]
+        matrix = np.where(values[:, None] > values[None, :], val, 1 / val)
+
+        _recommended_weights = dict(zip(metrics, column_average_weights(matrix).tolist()))
+    return dict(_recommended_weights)
+
+# Function to project vectors onto the probability simplex
+def project_to_simplex(v):
+    """Euclidean projection of a vector onto {w >= 0, sum(w) = 1} (sort-based, O(n log n))."""
+    v = np.asarray(v, dtype=float)
+    u = np.sort(v)[::-1]
+    cumulative = np.cumsum(u) - 1
+    k = np.arange(1, len(v) + 1)
+    rho = np.flatnonzero(u - cumulative / k > 0)[-1]
+    return np.maximum(v - cumulative[rho] / (rho + 1), 0.0)
+
+# Function to learn weights that reproduce an expert ranking of devices
+def weights_from_ranking(normalized_matrix, ranking, prior=None, margin=0.1, reg=1e-3,
+                         max_iter=5000, tol=1e-10):
+    """Finds simplex weights under which the devices are ordered as in `ranking`.
+
+    Every pair (better, worse) of the ranking contributes a squared hinge loss
+    max(0, margin - (n_better - n_worse)·w)^2, so the index of the better device
+    should exceed the other by at least `margin`. A small pull towards `prior`
+    picks a stable solution among the many that may fit. The loss is minimized
+    by projected gradient descent on the simplex, with all pairs in one matrix.
+
+    Args:
+        normalized_matrix (array-like): (devices x metrics) normalized metrics of the
+            reference devices, columns in METRIC_CODES order
+        ranking (list): Row indices of normalized_matrix from best to worst
+        prior: Weights dict or array the solution is pulled towards (recommended by default)
+        margin (float): Desired index gap between consecutive devices (0-10 scale)
+        reg (float): Strength of the pull towards the prior
+        max_iter (int): Maximum number of iterations
+        tol (float): Stop when no weight moves more than this
+
+    Returns:
+        tuple: (weights dict by metric code, summing to 1; share of ranked pairs whose
+        order is reproduced)
+    """
+    normalized_matrix = np.asarray(normalized_matrix, dtype=float)
+    ranking = list(ranking)
+    if len(ranking) < 2:
+        raise ValueError("Se necesitan al menos dos dispositivos para aprender pesos de un ranking.")
+    if prior is None:
+        prior = get_recommended_weights()
+    if isinstance(prior, dict):
+        prior = [float(prior[m]) for m in METRIC_CODES]
+    prior = project_to_simplex(prior)
+
+    better, worse = np.triu_indices(len(ranking), 1)
+    ranking = np.asarray(ranking)
+    diffs = normalized_matrix[ranking[better]] - normalized_matrix[ranking[worse]]
+    n_pairs = len(diffs)
+    # Lipschitz constant of the gradient gives a safe fixed step
+    step = 1 / (2 * np.linalg.norm(diffs, 2) ** 2 / n_pairs + 2 * reg)
+
+    weights = prior.copy()
+    for _ in range(max_iter):
+        slack = np.maximum(margin - diffs @ weights, 0.0)
+        gradient = -2 * diffs.T @ slack / n_pairs + 2 * reg * (weights - prior)
+        new_weights = project_to_simplex(weights - step * gradient)
+        converged = np.abs(new_weights - weights).max() < tol
+        weights = new_weights
+        if converged:
+            break
+
+    agreement = float((diffs @ weights > 0).mean())
+    return dict(zip(METRIC_CODES, weights.tolist())), agreement
 
 # Function to validate and normalize manually entered weights
 def validate_manual_weights(weights_dict):